@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class CleanupConfig(AppConfig):
+    name = 'cleanup'
+    verbose_name = 'Очистка медиа-файлов'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from cleanup.services import BATCH_SIZE, media_prefixes, reconcile, sweep
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление медиа-файлов из очереди. С --reconcile предварительно '
+        'ищет файлы, на которые не ссылается ни одна запись'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reconcile',
+            action='store_true',
+            help='Найти неиспользуемые файлы в ' + ', '.join(media_prefixes())
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=24 * 60 * 60,
+            help='Не трогать файлы моложе указанного числа секунд'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['reconcile']:
+            found = reconcile(options['grace'], batch_size)
+            self.stdout.write(f'Найдено неиспользуемых файлов: {found}')
+        deleted = sweep(batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {deleted}'))
@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class PendingDeletion(models.Model):
+    """Медиа-файл, ожидающий удаления сборщиком"""
+    name = models.CharField('Путь к файлу', max_length=255, unique=True)
+    created_at = models.DateTimeField('Дата постановки', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Файл на удаление'
+        verbose_name_plural = 'Файлы на удаление'
+        ordering = ['pk']
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,137 @@
+import logging
+import os
+import time
+from functools import partial
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from recipes.models import Recipe
+from users.models import User
+
+from .models import PendingDeletion
+
+logger = logging.getLogger(__name__)
+
+# Модели и поля, файлы которых обслуживает сборщик
+MEDIA_FIELDS = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
+BATCH_SIZE = 500
+
+
+def media_prefixes():
+    """Каталоги загрузки обслуживаемых полей: recipes/, users/"""
+    return sorted({
+        model._meta.get_field(field).upload_to for model, field in MEDIA_FIELDS
+    })
+
+
+def _record(names):
+    PendingDeletion.objects.bulk_create(
+        [PendingDeletion(name=name) for name in names],
+        ignore_conflicts=True
+    )
+
+
+def schedule_deletion(names):
+    """
+    Постановка файлов в очередь на удаление после фиксации транзакции.
+    При откате транзакции файлы остаются на месте.
+    """
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(partial(_record, names))
+
+
+def referenced_names(names):
+    """Какие из файлов ещё используются записями в базе"""
+    referenced = set()
+    for model, field in MEDIA_FIELDS:
+        referenced.update(
+            model.objects.filter(**{f'{field}__in': names})
+            .values_list(field, flat=True)
+        )
+    return referenced
+
+
+def sweep(batch_size=BATCH_SIZE, storage=default_storage):
+    """
+    Удаление файлов из очереди пачками. Файл, на который снова
+    ссылается запись, не удаляется. Возвращает число удалённых файлов.
+    """
+    deleted = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            PendingDeletion.objects.filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'name')[:batch_size]
+        )
+        if not batch:
+            return deleted
+        last_pk = batch[-1][0]
+        referenced = referenced_names([name for _, name in batch])
+        done = []
+        for pk, name in batch:
+            if name not in referenced:
+                try:
+                    storage.delete(name)
+                except OSError:
+                    # Запись остаётся в очереди до следующего прохода
+                    logger.warning('Не удалось удалить %s', name)
+                    continue
+                deleted += 1
+            done.append(pk)
+        PendingDeletion.objects.filter(pk__in=done).delete()
+
+
+def _iter_files(path):
+    """Рекурсивный обход каталога без построения полного списка"""
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def _unreferenced(names):
+    referenced = referenced_names(names)
+    return [name for name in names if name not in referenced]
+
+
+def reconcile(grace, batch_size=BATCH_SIZE, storage=default_storage):
+    """
+    Пометка и очистка: файлы в каталогах загрузки, на которые не
+    ссылается ни одна запись, ставятся в очередь на удаление.
+    Каталог обходится итератором, ссылки проверяются пачками, поэтому
+    ни файлы, ни записи целиком в память не загружаются. Файлы моложе
+    grace секунд пропускаются: их запись может быть ещё не сохранена.
+    Возвращает число найденных файлов.
+    """
+    threshold = time.time() - grace
+    found = 0
+    names = []
+    for prefix in media_prefixes():
+        for entry in _iter_files(storage.path(prefix)):
+            if entry.stat().st_mtime > threshold:
+                continue
+            names.append(
+                os.path.relpath(entry.path, storage.location)
+                .replace(os.sep, '/')
+            )
+            if len(names) >= batch_size:
+                orphans = _unreferenced(names)
+                _record(orphans)
+                found += len(orphans)
+                names = []
+    if names:
+        orphans = _unreferenced(names)
+        _record(orphans)
+        found += len(orphans)
+    return found
@@ -0,0 +1,52 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+
+from .services import MEDIA_FIELDS, schedule_deletion
+
+
+def _file_name(instance, field):
+    # Значение берётся из __dict__, чтобы не загружать отложенное поле
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value) or ''
+
+
+def make_receivers(model, field):
+    def read_old_file(sender, instance, raw=False, update_fields=None,
+                      **kwargs):
+        instance._media_replaced = ''
+        # Отложенное и не присвоенное поле при сохранении не пишется
+        if (raw or instance._state.adding or field not in instance.__dict__
+                or (update_fields is not None
+                    and field not in update_fields)):
+            return
+        old = sender._default_manager.filter(pk=instance.pk).values_list(
+            field, flat=True
+        ).first()
+        if old and old != _file_name(instance, field):
+            instance._media_replaced = old
+
+    def file_replaced(sender, instance, **kwargs):
+        # Старый файл ставится в очередь, только если запись сохранилась
+        schedule_deletion([getattr(instance, '_media_replaced', '')])
+
+    def load_deferred_file(sender, instance, **kwargs):
+        # После удаления строки имя отложенного поля уже не прочитать
+        if field not in instance.__dict__:
+            instance.refresh_from_db(fields=[field])
+
+    def file_released(sender, instance, **kwargs):
+        schedule_deletion([_file_name(instance, field)])
+
+    pre_save.connect(read_old_file, sender=model, weak=False)
+    post_save.connect(file_replaced, sender=model, weak=False)
+    pre_delete.connect(load_deferred_file, sender=model, weak=False)
+    # post_delete срабатывает и для удаления через QuerySet и каскад
+    post_delete.connect(file_released, sender=model, weak=False)
+
+
+for model, field in MEDIA_FIELDS:
+    make_receivers(model, field)
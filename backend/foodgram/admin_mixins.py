@@ -0,0 +1,39 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# С какого размера таблицы вместо COUNT(*) берётся оценка планировщика
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который для нефильтрованного списка в PostgreSQL
+    берёт число строк из статистики pg_class вместо COUNT(*).
+    На больших таблицах COUNT(*) читает всю таблицу.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class ScalableAdminMixin:
+    """
+    Настройки списков админки для больших таблиц: без полного
+    подсчёта строк и с оценкой размера нефильтрованного списка.
+    """
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
@@ -0,0 +1,182 @@
+import gzip
+import re
+import zlib
+from hashlib import md5
+
+import brotli
+import zstandard
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from .metrics import record_cache
+
+# Порядок предпочтения при одинаковом весе в Accept-Encoding
+PREFERENCE = ('zstd', 'br', 'gzip')
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-ndjson',
+)
+ETAG_RE = re.compile(r'^"')
+
+
+def _gzip_stream(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (
+        lambda chunk: (
+            compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        ),
+        compressor.flush
+    )
+
+
+def _brotli_stream(level):
+    compressor = brotli.Compressor(quality=level)
+    return (
+        lambda chunk: compressor.process(chunk) + compressor.flush(),
+        compressor.finish
+    )
+
+
+def _zstd_stream(level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return (
+        lambda chunk: (
+            compressor.compress(chunk)
+            + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        ),
+        compressor.flush
+    )
+
+
+# Кодировка: (сжатие целиком, потоковое сжатие,
+#             уровень для ответов, уровень для кэшируемых ответов)
+CODECS = {
+    'gzip': (
+        lambda data, level: gzip.compress(data, level, mtime=0),
+        _gzip_stream, 6, 9
+    ),
+    'br': (
+        lambda data, level: brotli.compress(data, quality=level),
+        _brotli_stream, 4, 11
+    ),
+    'zstd': (
+        lambda data, level: zstandard.ZstdCompressor(level=level).compress(
+            data
+        ),
+        _zstd_stream, 3, 19
+    ),
+}
+
+
+def choose_encoding(header):
+    """Выбор кодировки по Accept-Encoding с учётом q-весов"""
+    weights = {}
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    default = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    for name in PREFERENCE:
+        weight = weights.get(name, default)
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def compress_stream(chunks, encoding):
+    """Сжатие потокового ответа по частям, без буферизации всего ответа"""
+    _, stream, level, _ = CODECS[encoding]
+    feed, finish = stream(level)
+    for chunk in chunks:
+        data = feed(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов gzip, brotli или zstd по Accept-Encoding.
+
+    Ответы меньше COMPRESSION_MIN_SIZE не сжимаются, потоковые
+    ответы сжимаются по частям. Для представлений с precompress = True
+    сжатые байты кэшируются по ETag с максимальным уровнем сжатия:
+    пока данные не изменились, повторно сжимать ответ не нужно.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.process_response(request, self.get_response(request))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        request._precompress = getattr(view_class, 'precompress', False)
+
+    def process_response(self, request, response):
+        if (response.status_code != 200
+                or response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith(
+                    COMPRESSIBLE_TYPES
+                )):
+            return response
+        if response.streaming:
+            if getattr(response, 'is_async', False):
+                return response
+        elif len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            content = self.compress(request, response, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        if response.has_header('ETag'):
+            # Сжатое представление не совпадает побайтно с исходным
+            response['ETag'] = ETAG_RE.sub('W/"', response['ETag'])
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compress(self, request, response, encoding):
+        compress, _, level, best_level = CODECS[encoding]
+        etag = response.get('ETag')
+        if not (getattr(request, '_precompress', False) and etag):
+            return compress(response.content, level)
+        # ETag может не различать форматы ответа (JSON и browsable API),
+        # поэтому в ключе учитывается и Content-Type
+        key = 'compressed:{}:{}'.format(encoding, md5(
+            '{}:{}'.format(response['Content-Type'], etag).encode()
+        ).hexdigest())
+        content = cache.get(key)
+        record_cache('compressed', content is not None)
+        if content is None:
+            content = compress(response.content, best_level)
+            cache.set(key, content, settings.COMPRESSION_CACHE_TIMEOUT)
+        return content
@@ -0,0 +1,116 @@
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PIN_COOKIE_NAME = 'db_primary_pin'
+PIN_CACHE_KEY = 'db_primary_pin:{}'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Реплика, выбранная для текущего запроса, или None - основная база
+_replica_alias = ContextVar('replica_alias', default=None)
+
+
+class ReplicaRouter:
+    """
+    Маршрутизатор базы данных: чтение безопасных запросов уходит
+    на реплику, выбранную ReplicaRoutingMiddleware один раз на запрос,
+    запись и всё остальное - на основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        # После записи дочитываем запрос с основной базы
+        _replica_alias.set(None)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему через репликацию
+        return db not in settings.DATABASE_REPLICAS
+
+
+def get_token_user_id(request, using):
+    """Пользователь по заголовку Authorization: Token <key>"""
+    from rest_framework.authtoken.models import Token
+
+    keyword, _, key = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    if keyword != 'Token' or not key:
+        return None
+    # Токены создаются при входе, после которого клиент уже
+    # закреплён cookie, поэтому их можно искать на реплике
+    return (
+        Token.objects.using(using)
+        .filter(key=key.strip())
+        .values_list('user_id', flat=True)
+        .first()
+    )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Включает чтение с реплик для GET/HEAD-запросов.
+
+    После успешного небезопасного запроса в течение REPLICA_PIN_SECONDS
+    клиент читает с основной базы, чтобы видеть собственные изменения
+    несмотря на задержку репликации. Закрепление хранится в cookie клиента
+    и в кэше по id пользователя, чтобы оно действовало и на других
+    его устройствах.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _is_pinned(self, request, replica):
+        try:
+            pinned_until = float(request.COOKIES.get(PIN_COOKIE_NAME, 0))
+        except ValueError:
+            pinned_until = 0
+        if pinned_until > time.time():
+            return True
+        user_id = get_token_user_id(request, replica)
+        return (
+            user_id is not None
+            and cache.get(PIN_CACHE_KEY.format(user_id)) is not None
+        )
+
+    def _pin(self, request, response):
+        window = settings.REPLICA_PIN_SECONDS
+        response.set_cookie(
+            PIN_COOKIE_NAME,
+            str(int(time.time()) + window),
+            max_age=window,
+            httponly=True,
+            samesite='Lax'
+        )
+        # DRF сохраняет аутентифицированного пользователя в request.user
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            cache.set(PIN_CACHE_KEY.format(user.pk), True, window)
+
+    def __call__(self, request):
+        replica = None
+        if request.method in SAFE_METHODS and settings.DATABASE_REPLICAS:
+            # Одна реплика на весь запрос: страница, COUNT и prefetch
+            # читают данные с одинаковой задержкой репликации
+            replica = random.choice(settings.DATABASE_REPLICAS)
+            if self._is_pinned(request, replica):
+                replica = None
+        token = _replica_alias.set(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_alias.reset(token)
+
+        # Неудачный запрос ничего не записал, закреплять клиента незачем
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self._pin(request, response)
+        return response
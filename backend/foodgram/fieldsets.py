@@ -0,0 +1,98 @@
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def _parse_tree(value):
+    """'id,author.username' -> {'id': {}, 'author': {'username': {}}}"""
+    tree = {}
+    for path in filter(None, (item.strip() for item in value.split(','))):
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def get_fieldsets(request):
+    """
+    Разбор ?fields= и ?omit= запроса, результат кэшируется на запросе.
+    Выборка полей применяется только к чтению (GET/HEAD).
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return {}, {}
+    if not hasattr(request, '_fieldsets'):
+        params = request.query_params
+        request._fieldsets = (
+            _parse_tree(params.get(FIELDS_PARAM, '')),
+            _parse_tree(params.get(OMIT_PARAM, '')),
+        )
+    return request._fieldsets
+
+
+def _merge(tree, other):
+    for key, subtree in other.items():
+        if key in tree and not tree[key]:
+            continue
+        tree[key] = _merge(tree.get(key, {}), subtree) if subtree else {}
+    return tree
+
+
+def omit_fields(request, paths):
+    """Исключение полей из ответа вдобавок к ?omit="""
+    include, omit = get_fieldsets(request)
+    request._fieldsets = (
+        include, _merge(dict(omit), _parse_tree(','.join(paths)))
+    )
+
+
+def is_field_requested(request, path):
+    """
+    Нужно ли поле по пути 'author.is_subscribed' в ответе.
+    Используется представлениями, чтобы не делать запросы
+    для полей, которые клиент не запросил.
+    """
+    include, omit = get_fieldsets(request)
+    for part in path.split('.'):
+        if include and part not in include:
+            return False
+        if part in omit and not omit[part]:
+            return False
+        include = include.get(part, {})
+        omit = omit.get(part, {})
+    return True
+
+
+class SparseFieldsetsMixin:
+    """
+    Поддержка ?fields=id,name,author.username и ?omit=author.email.
+    Поля, не попавшие в ответ, не вычисляются, поэтому их
+    SerializerMethodField и вложенные сериализаторы не делают запросов.
+    """
+
+    def _get_fieldset(self):
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            # Вложенный сериализатор без выборки от родителя
+            return {}, {}
+        return get_fieldsets(self.context.get('request'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        include, omit = self._get_fieldset()
+        if not include and not omit:
+            return fields
+        for name in list(fields):
+            if include and name not in include:
+                del fields[name]
+            elif name in omit and not omit[name]:
+                del fields[name]
+        for name, field in fields.items():
+            nested = getattr(field, 'child', field)
+            if isinstance(nested, SparseFieldsetsMixin):
+                nested._fieldset = (include.get(name, {}), omit.get(name, {}))
+        return fields
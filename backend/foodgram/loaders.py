@@ -0,0 +1,68 @@
+from django.db import models
+from rest_framework import serializers
+
+
+class BatchLoader:
+    """
+    Загрузчик в стиле DataLoader. Ключи регистрируются заранее через
+    prime(), а при первом load() все накопленные ключи разрешаются
+    одной функцией batch_fn (обычно один запрос с IN). Результаты
+    запоминаются до конца запроса.
+    """
+
+    def __init__(self, batch_fn, default=None):
+        self.batch_fn = batch_fn
+        self.default = default
+        self.cache = {}
+        self.pending = set()
+
+    def prime(self, keys):
+        self.pending.update(key for key in keys if key not in self.cache)
+
+    def load(self, key):
+        if key not in self.cache:
+            self.pending.add(key)
+            self._resolve()
+        return self.cache[key]
+
+    def _resolve(self):
+        keys, self.pending = self.pending, set()
+        found = self.batch_fn(keys)
+        for key in keys:
+            self.cache[key] = found.get(key, self.default)
+
+
+def get_loader(context, name, batch_fn, default=None):
+    """
+    Загрузчик, общий для всех сериализаторов одного запроса.
+    Без запроса в контексте загрузчик живёт в самом контексте.
+    """
+    request = context.get('request')
+    holder = request.__dict__ if request is not None else context
+    loaders = holder.setdefault('_batch_loaders', {})
+    if name not in loaders:
+        loaders[name] = BatchLoader(batch_fn, default)
+    return loaders[name]
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    Список, который перед сериализацией передаёт все объекты в
+    child.prime(), чтобы связанные данные загрузились пачкой.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        items = list(data)
+        prime = getattr(self.child, 'prime', None)
+        if prime is not None:
+            prime(items)
+        return super().to_representation(items)
+
+
+def reset_loaders(context):
+    """Сброс загрузчиков, например между порциями потокового ответа"""
+    request = context.get('request')
+    holder = request.__dict__ if request is not None else context
+    holder.pop('_batch_loaders', None)
@@ -0,0 +1,154 @@
+import os
+import time
+from contextlib import ExitStack
+from ipaddress import ip_address, ip_network
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+METRICS_PATH = '/metrics'
+
+VIEW_LATENCY = Histogram(
+    'foodgram_view_latency_seconds',
+    'Время обработки запроса представлением',
+    ['view', 'action', 'method']
+)
+VIEW_ERRORS = Counter(
+    'foodgram_view_errors_total',
+    'Ответы с кодом 4xx/5xx',
+    ['view', 'action', 'method', 'status']
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Количество SQL-запросов за HTTP-запрос',
+    ['view', 'action'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, float('inf'))
+)
+DB_TIME = Histogram(
+    'foodgram_db_time_seconds',
+    'Суммарное время SQL-запросов за HTTP-запрос',
+    ['view', 'action']
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кэшу по результату (hit/miss)',
+    ['cache', 'result']
+)
+UPLOAD_SIZE = Histogram(
+    'foodgram_image_upload_bytes',
+    'Размер загруженных изображений',
+    ['kind'],
+    buckets=(
+        16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024,
+        4 * 1024 * 1024, 10 * 1024 * 1024, float('inf')
+    )
+)
+
+
+def record_cache(cache_name, hit):
+    CACHE_REQUESTS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def record_upload(kind, image):
+    if image is not None:
+        UPLOAD_SIZE.labels(kind).observe(image.size)
+
+
+def _view_labels(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__, ''
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_class.__name__, actions.get(request.method.lower(), '')
+
+
+class QueryTimer:
+    """Обёртка выполнения SQL, считающая запросы и их время"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Сбор метрик задержки, ошибок и SQL по представлениям DRF"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == METRICS_PATH:
+            return self.get_response(request)
+        request.metrics_labels = None
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        labels = request.metrics_labels
+        if labels is not None:
+            view, action = labels
+            VIEW_LATENCY.labels(view, action, request.method).observe(
+                elapsed
+            )
+            if response.status_code >= 400:
+                VIEW_ERRORS.labels(
+                    view, action, request.method, response.status_code
+                ).inc()
+            DB_QUERIES.labels(view, action).observe(timer.count)
+            DB_TIME.labels(view, action).observe(timer.duration)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_labels = _view_labels(request, view_func)
+
+
+def _is_allowed_address(address):
+    """Адрес клиента входит в METRICS_ALLOWED_IPS"""
+    try:
+        address = ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ip_network(network, strict=False)
+        for network in settings.METRICS_ALLOWED_IPS
+    )
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus"""
+    # Заголовкам X-Forwarded-For не доверяем: их задаёт клиент
+    if not (
+        _is_allowed_address(request.META.get('REMOTE_ADDR', ''))
+        or request.user.is_staff
+    ):
+        return HttpResponseForbidden()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,127 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import http_date
+
+
+def relation_fingerprint(queryset):
+    """
+    Отпечаток набора связей пользователя: количество и максимальный id.
+    Любое добавление увеличивает max(id), любое удаление - уменьшает count.
+    """
+    state = queryset.order_by().aggregate(count=Count('pk'), last=Max('pk'))
+    return state['count'], state['last']
+
+
+class ConditionalGetMixin:
+    """
+    Поддержка условных GET-запросов (ETag / Last-Modified).
+
+    Валидаторы вычисляются одним агрегирующим запросом по полям
+    conditional_fields, без сериализации ответа. Если клиент прислал
+    совпадающий If-None-Match/If-Modified-Since, возвращается 304.
+    """
+    conditional_fields = ('updated_at',)
+
+    def get_user_state(self, user):
+        """Персональные данные пользователя, влияющие на ответ"""
+        return ()
+
+    def use_conditional_get(self):
+        """Можно ли вычислить валидаторы для текущего запроса"""
+        return True
+
+    def is_public_response(self):
+        """
+        Ответ не зависит от пользователя: его можно хранить
+        в общих кэшах (CDN, nginx) независимо от авторизации.
+        """
+        return False
+
+    def _get_validators(self, queryset):
+        aggregates = {
+            f'max_{index}': Max(field)
+            for index, field in enumerate(self.conditional_fields)
+        }
+        state = queryset.order_by().aggregate(
+            count=Count('pk', distinct=True), **aggregates
+        )
+        if not state['count'] and self.detail:
+            return None, None
+        timestamps = [
+            value for key, value in state.items()
+            if key.startswith('max_') and value is not None
+        ]
+        last_modified = max(timestamps) if timestamps else None
+        user = self.request.user
+        personal = user.is_authenticated and not self.is_public_response()
+        parts = [
+            self.action,
+            self.request.get_full_path(),
+            # JSON и HTML (browsable API) - разные представления
+            getattr(self.request, 'accepted_media_type', None),
+            sorted(state.items()),
+            user.pk if personal else None,
+            self.get_user_state(user) if personal else (),
+        ]
+        etag = '"{}"'.format(md5(repr(parts).encode()).hexdigest())
+        if personal:
+            # Персональные флаги не имеют даты изменения,
+            # поэтому для них валидатором служит только ETag
+            last_modified = None
+        return etag, last_modified
+
+    def _conditional_get(self, queryset, handler, *args, **kwargs):
+        request = self.request
+        etag, last_modified = self._get_validators(queryset)
+        timestamp = (
+            int(last_modified.timestamp()) if last_modified else None
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304) and etag:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        patch_vary_headers(response, ('Accept',))
+        if self.is_public_response():
+            patch_cache_control(
+                response, public=True,
+                max_age=settings.PUBLIC_CACHE_MAX_AGE
+            )
+        else:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_conditional_get():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._conditional_get(
+            queryset, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in self.kwargs:
+            # Например, /users/me/, где объект берётся не из URL
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            return super().retrieve(request, *args, **kwargs)
+        return self._conditional_get(
+            queryset, super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,112 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_QUERY_PARAM = 'profile'
+PROFILE_SALT = 'foodgram.profiling'
+PROFILE_EXTENSION = '.prof'
+
+# cProfile не допускает двух активных профилировщиков в процессе
+_profiler_lock = threading.Lock()
+
+
+def make_profile_token(user):
+    """Подписанный токен, включающий профилирование для пользователя"""
+    return signing.TimestampSigner(salt=PROFILE_SALT).sign(str(user.pk))
+
+
+def _is_staff_token(token):
+    try:
+        user_id = signing.TimestampSigner(salt=PROFILE_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return get_user_model().objects.filter(
+        pk=user_id, is_staff=True, is_active=True
+    ).exists()
+
+
+def list_profiles():
+    """Сохранённые профили, новые первыми"""
+    directory = settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    entries = [
+        entry for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.endswith(PROFILE_EXTENSION)
+    ]
+    return sorted(entries, key=lambda entry: entry.name, reverse=True)
+
+
+def _rotate():
+    for entry in list_profiles()[settings.PROFILING_MAX_FILES:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов через cProfile.
+
+    Включается подписанным токеном сотрудника в заголовке X-Profile
+    или параметре ?profile=, либо случайно для одного запроса из
+    PROFILING_SAMPLE_RATE. Результат сохраняется в PROFILING_DIR
+    в формате pstats, старые файлы удаляются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _should_profile(self, request):
+        token = (
+            request.META.get(PROFILE_HEADER)
+            or request.GET.get(PROFILE_QUERY_PARAM)
+        )
+        if token:
+            return _is_staff_token(token)
+        sample_rate = settings.PROFILING_SAMPLE_RATE
+        return bool(sample_rate) and random.randrange(sample_rate) == 0
+
+    def __call__(self, request):
+        if not self._should_profile(request):
+            return self.get_response(request)
+        if not _profiler_lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            elapsed = (time.perf_counter() - started) * 1000
+        finally:
+            _profiler_lock.release()
+        self._save(profiler, request, elapsed)
+        return response
+
+    def _save(self, profiler, request, elapsed):
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = re.sub(r'[^\w-]+', '_', request.path).strip('_') or 'root'
+        name = '{}-{}-{}-{:.0f}ms{}'.format(
+            datetime.now().strftime('%Y%m%d%H%M%S%f'),
+            request.method,
+            path[:80],
+            elapsed,
+            PROFILE_EXTENSION
+        )
+        profiler.dump_stats(os.path.join(settings.PROFILING_DIR, name))
+        _rotate()
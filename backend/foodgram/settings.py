@@ -18,6 +18,15 @@ DEBUG = os.getenv('DEBUG', 'False') == 'True'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Режим отдачи медиа вне DEBUG: accel (через nginx X-Accel-Redirect)
+# или sendfile (файл отдаёт Django, для локального запуска)
+MEDIA_SERVE_MODE = os.getenv('MEDIA_SERVE_MODE', 'sendfile')
+MEDIA_ACCEL_REDIRECT_URL = os.getenv(
+    'MEDIA_ACCEL_REDIRECT_URL', '/protected-media/'
+)
+# Загруженные файлы получают уникальные имена и не меняются
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', 60 * 60 * 24 * 365))
+
 # Настройки статических файлов
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
@@ -42,11 +51,18 @@ INSTALLED_APPS = [
     'django_filters',
     'recipes',
     'users',
+    'stats',
+    'cleanup',
+    'sync',
 ]
 
 # Список промежуточных слоев
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.profiling.ProfilingMiddleware',
+    'foodgram.metrics.MetricsMiddleware',
+    'foodgram.compression.CompressionMiddleware',
+    'foodgram.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,9 +103,109 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOST'),
         'PORT': os.getenv('POSTGRES_PORT'),
+        # Постоянные соединения с проверкой перед повторным использованием
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Реплики только для чтения: POSTGRES_REPLICAS=host[:port][/name],...
+# Незаданные порт и имя базы берутся из основной базы
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    filter(None, os.getenv('POSTGRES_REPLICAS', '').split(','))
+):
+    address, _, name = replica.strip().partition('/')
+    host, _, port = address.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        # В тестах реплика указывает на тестовую основную базу
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+# Сколько секунд после записи клиент читает с основной базы
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+# Настройки кэша (по умолчанию локальный кэш процесса).
+# LocMemCache не разделяется между воркерами gunicorn: у каждого воркера
+# свои корзины ограничения запросов, закрепления за основной базой
+# и кэши. В production нужен общий кэш (CACHE_BACKEND, CACHE_LOCATION),
+# например django.core.cache.backends.redis.RedisCache.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Лента подписок: авторы с большим числом подписчиков
+# не раскладываются по лентам при публикации, а читаются при запросе
+FEED_FANOUT_THRESHOLD = int(os.getenv('FEED_FANOUT_THRESHOLD', 1000))
+FEED_MAX_LENGTH = int(os.getenv('FEED_MAX_LENGTH', 500))
+
+# Сколько похожих рецептов хранится для каждого рецепта
+SIMILAR_RECIPES_TOP_K = int(os.getenv('SIMILAR_RECIPES_TOP_K', 10))
+
+# Популярные рецепты: период полураспада оценки и кэш первых N
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 72))
+TRENDING_TOP_N = int(os.getenv('TRENDING_TOP_N', 100))
+TRENDING_CACHE_TIMEOUT = int(os.getenv('TRENDING_CACHE_TIMEOUT', 60))
+
+# Срок хранения в общих кэшах ответов, не зависящих от пользователя
+PUBLIC_CACHE_MAX_AGE = int(os.getenv('PUBLIC_CACHE_MAX_AGE', 60))
+
+# Автодополнение ингредиентов: размер топа для 1-2 буквенных префиксов
+INGREDIENT_PREFIX_TOP_K = int(os.getenv('INGREDIENT_PREFIX_TOP_K', 20))
+
+# Адреса (или сети), с которых сборщик метрик читает /metrics,
+# например METRICS_ALLOWED_IPS=127.0.0.1,172.16.0.0/12.
+# Остальным доступ только для сотрудников, вошедших через админку
+METRICS_ALLOWED_IPS = [
+    address.strip() for address in
+    os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+    if address.strip()
+]
+
+# Профилирование запросов: по токену сотрудника или каждый N-й запрос
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_SAMPLE_RATE = int(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 100))
+PROFILING_TOKEN_MAX_AGE = 60 * 60 * 24
+
+# PDF-версии списков покупок: фоновая отрисовка и кэш файлов
+PDF_EXPORT_DIR = os.getenv(
+    'PDF_EXPORT_DIR', os.path.join(BASE_DIR, 'exports')
+)
+PDF_EXPORT_FONT = os.getenv(
+    'PDF_EXPORT_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+PDF_EXPORT_WORKERS = int(os.getenv('PDF_EXPORT_WORKERS', 2))
+PDF_EXPORT_MAX_AGE = int(os.getenv('PDF_EXPORT_MAX_AGE', 60 * 60 * 24 * 7))
+PDF_EXPORT_MAX_BYTES = int(
+    os.getenv('PDF_EXPORT_MAX_BYTES', 200 * 1024 * 1024)
+)
+# Через сколько секунд незавершённое задание считается потерянным
+PDF_EXPORT_PENDING_TIMEOUT = int(os.getenv('PDF_EXPORT_PENDING_TIMEOUT', 300))
+
+# Сжатие ответов: минимальный размер и срок хранения сжатых копий
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_CACHE_TIMEOUT = int(
+    os.getenv('COMPRESSION_CACHE_TIMEOUT', 60 * 60)
+)
+
+# Сколько дней хранится журнал изменений для синхронизации клиентов
+SYNC_RETENTION_DAYS = int(os.getenv('SYNC_RETENTION_DAYS', 30))
+
 # Настройки языка и времени
 LANGUAGE_CODE = 'ru-ru'
 TIME_ZONE = 'UTC'
@@ -107,6 +223,15 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'foodgram.throttling.AnonCostRateThrottle',
+        'foodgram.throttling.UserCostRateThrottle',
+    ],
+    # Ёмкость корзины токенов и скорость её пополнения
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON_RATE', '120/min'),
+        'user': os.getenv('THROTTLE_USER_RATE', '600/min'),
+    },
 }
 
 # Указываем кастомную модель пользователя
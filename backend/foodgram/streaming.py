@@ -0,0 +1,77 @@
+import json
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .loaders import reset_loaders
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+CHUNK_SIZE = 500
+# Стоимость потоковой выгрузки для ограничения частоты запросов
+STREAM_THROTTLE_COST = 100
+
+
+def ndjson_line(data):
+    return (
+        json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+    ).encode()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Объект на строку. Потоковые списки формируются в NDJSONStreamMixin"""
+    media_type = NDJSON_MEDIA_TYPE
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, list):
+            return b''.join(ndjson_line(item) for item in data)
+        return ndjson_line(data)
+
+
+class NDJSONStreamMixin:
+    """
+    Режим Accept: application/x-ndjson для списков: все подходящие
+    объекты отдаются потоком без пагинации. Строки читаются из базы
+    порциями по CHUNK_SIZE, prefetch_related и пакетные загрузчики
+    выполняются для каждой порции, поэтому память не растёт с размером
+    выборки, а первые строки уходят клиенту сразу.
+    """
+    renderer_classes = [
+        *api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer
+    ]
+
+    def wants_ndjson(self):
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return isinstance(renderer, NDJSONRenderer)
+
+    def stream_ndjson(self, queryset, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        context = self.get_serializer_context()
+        # Поток читается после выхода из middleware, поэтому база
+        # выбирается сейчас, пока действует маршрутизация запроса
+        queryset = queryset.using(queryset.db)
+
+        def rows():
+            objects = queryset.iterator(chunk_size=CHUNK_SIZE)
+            while True:
+                chunk = list(islice(objects, CHUNK_SIZE))
+                if not chunk:
+                    return
+                data = serializer_class(chunk, many=True, context=context).data
+                yield b''.join(ndjson_line(item) for item in data)
+                reset_loaders(context)
+
+        return StreamingHttpResponse(rows(), content_type=NDJSON_MEDIA_TYPE)
+
+    def list(self, request, *args, **kwargs):
+        if self.wants_ndjson():
+            return self.stream_ndjson(
+                self.filter_queryset(self.get_queryset())
+            )
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,14 @@
+"""
+Настройки для тестов: python manage.py test --settings=foodgram.test_settings
+
+Добавляют отдельную базу 'replica', на которой tests/test_db_router.py
+проверяет, где выполнен каждый запрос. DATABASE_REPLICAS остаётся
+пустым, поэтому остальные тесты читают с основной базы.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica"},
+}
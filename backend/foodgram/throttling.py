@@ -0,0 +1,123 @@
+import math
+import time
+from contextlib import contextmanager
+
+from rest_framework.throttling import SimpleRateThrottle
+
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_DELAY = 0.005
+DEEP_PAGE_ROWS = 1000
+
+
+def pagination_cost(request, paginator):
+    """
+    Стоимость запроса страницы: пропорциональна размеру страницы
+    относительно стандартного и глубине смещения.
+    """
+    if paginator is None:
+        return 1
+    page_size = paginator.get_page_size(request) or paginator.page_size
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    default_size = paginator.page_size or page_size
+    return (
+        math.ceil(page_size / default_size)
+        + (page - 1) * page_size // DEEP_PAGE_ROWS
+    )
+
+
+class CostRateThrottle(SimpleRateThrottle):
+    """
+    Ограничение запросов по алгоритму token bucket с учётом стоимости.
+
+    Ёмкость корзины и скорость пополнения задаются обычной для DRF
+    строкой rate ('120/min'). Каждое действие списывает столько токенов,
+    сколько вернёт view.get_throttle_cost(request) или укажет
+    view.throttle_costs[action] (по умолчанию 1). Состояние корзины
+    хранится в кэше и обновляется под блокировкой, поэтому при общем
+    кэше бюджет общий для всех процессов.
+    """
+
+    def get_cost(self, request, view):
+        get_throttle_cost = getattr(view, 'get_throttle_cost', None)
+        if get_throttle_cost is not None:
+            return get_throttle_cost(request)
+        costs = getattr(view, 'throttle_costs', {})
+        return costs.get(getattr(view, 'action', None), 1)
+
+    @contextmanager
+    def lock(self):
+        """
+        Блокировка корзины через атомарный cache.add, отдельная для
+        каждого ключа. Возвращает False, если за LOCK_ATTEMPTS попыток
+        захватить её не удалось.
+        """
+        lock_key = f'{self.key}:lock'
+        acquired = False
+        for _ in range(LOCK_ATTEMPTS):
+            acquired = self.cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if acquired:
+                break
+            time.sleep(LOCK_RETRY_DELAY)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.cache.delete(lock_key)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity = self.num_requests
+        refill_rate = self.num_requests / self.duration
+        cost = min(self.get_cost(request, view), capacity)
+        with self.lock() as acquired:
+            if not acquired:
+                # Корзину одновременно обновляют другие запросы того же
+                # клиента: отказ вместо записи без блокировки
+                self.wait_time = LOCK_TIMEOUT
+                return False
+            now = self.timer()
+            tokens, updated = self.cache.get(self.key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens < cost:
+                self.wait_time = (cost - tokens) / refill_rate
+                return False
+            self.cache.set(self.key, (tokens - cost, now), self.duration)
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class AnonCostRateThrottle(CostRateThrottle):
+    """Бюджет анонимных клиентов, по IP-адресу"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+class UserCostRateThrottle(CostRateThrottle):
+    """Бюджет пользователей, авторизованных по токену"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': request.user.pk
+        }
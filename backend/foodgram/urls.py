@@ -2,12 +2,27 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.static import serve
+
+from recipes.views import short_link_redirect
+
+from .metrics import metrics
+from .views import profile_download, profiles, readiness, serve_media
 
 urlpatterns = [
+    path('admin/profiles/', profiles, name='profiles'),
+    path(
+        'admin/profiles/<str:name>',
+        profile_download,
+        name='profile-download'
+    ),
     path('admin/', admin.site.urls),
+    path('api/health/ready/', readiness, name='readiness'),
+    path('metrics', metrics, name='metrics'),
     path('api/', include('users.urls')),
     path('api/', include('recipes.urls')),
+    path('api/', include('stats.urls')),
+    path('api/', include('sync.urls')),
+    path('s/<str:code>/', short_link_redirect, name='short-link'),
 ]
 
 # Обработка медиа-файлов
@@ -18,9 +33,5 @@ if settings.DEBUG:
     )
 else:
     urlpatterns += [
-        path(
-            'media/<path:path>',
-            serve,
-            {'document_root': settings.MEDIA_ROOT}
-        ),
+        path('media/<path:path>', serve_media, name='media'),
     ]
@@ -0,0 +1,185 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import DatabaseError, connection
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.html import format_html, format_html_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .profiling import (
+    PROFILE_EXTENSION,
+    list_profiles,
+    make_profile_token
+)
+from .warmup import is_ready, warm_up
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def _parse_range(header, size):
+    """
+    Разбор заголовка Range с одним диапазоном.
+    Возвращает (start, end) включительно, None если заголовок
+    не поддерживается, и False если диапазон невыполним.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Суффиксный диапазон: последние N байт
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, full_path, size, content_type):
+    """Отдача файла средствами Django с поддержкой Range"""
+    byte_range = None
+    if 'HTTP_RANGE' in request.META:
+        byte_range = _parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, length),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, path):
+    """
+    Отдача медиа-файлов.
+
+    Django только проверяет путь и наличие файла. В режиме accel
+    передача файла делегируется nginx через X-Accel-Redirect,
+    иначе файл отдаётся самим Django.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    stat = os.stat(full_path)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime
+    ):
+        return HttpResponseNotModified()
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_SERVE_MODE == 'accel':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_URL + quote(path)
+        )
+    else:
+        response = _file_response(
+            request, full_path, stat.st_size, content_type
+        )
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = (
+        f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+    )
+    return response
+
+
+def readiness(request):
+    """Проверка готовности приложения принимать запросы"""
+    if not is_ready():
+        # Повторная попытка, если при старте база была недоступна
+        warm_up()
+    if not is_ready():
+        return JsonResponse({'status': 'starting'}, status=503)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError:
+        return JsonResponse({'status': 'database unavailable'}, status=503)
+    return JsonResponse({'status': 'ready'})
+
+
+@staff_member_required
+def profiles(request):
+    """Список сохранённых профилей запросов"""
+    rows = format_html_join(
+        '\n',
+        '<tr><td><a href="{}">{}</a></td><td>{} КБ</td></tr>',
+        (
+            (entry.name, entry.name, entry.stat().st_size // 1024)
+            for entry in list_profiles()
+        )
+    )
+    return HttpResponse(format_html(
+        '<h1>Профили запросов</h1>'
+        '<p>Заголовок для профилирования запроса: '
+        '<code>X-Profile: {}</code></p>'
+        '<p>Файлы открываются через <code>python -m pstats</code> '
+        'или snakeviz.</p>'
+        '<table>{}</table>',
+        make_profile_token(request.user),
+        rows
+    ))
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Скачивание профиля в формате pstats"""
+    if not name.endswith(PROFILE_EXTENSION):
+        raise Http404
+    try:
+        path = safe_join(settings.PROFILING_DIR, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True)
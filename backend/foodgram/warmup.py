@@ -0,0 +1,51 @@
+import logging
+
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+_state = {'ready': False}
+
+
+def is_ready():
+    return _state['ready']
+
+
+def warm_up():
+    """
+    Прогрев приложения до приёма запросов.
+
+    Импортирует все представления и сериализаторы через URL-конфигурацию,
+    проверяет соединение с базой, заполняет горячие кэши (популярные
+    рецепты, авторы с большим числом подписчиков) и закрывает соединения,
+    чтобы процессы-воркеры gunicorn после fork открыли собственные.
+    """
+    if _state['ready']:
+        return
+    # Разрешение URL-конфигурации импортирует все модули представлений
+    get_resolver().url_patterns
+    api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    api_settings.DEFAULT_PERMISSION_CLASSES
+    api_settings.DEFAULT_PAGINATION_CLASS
+
+    from recipes.serializers import RecipeSerializer
+    from users.serializers import SubscriptionSerializer
+    RecipeSerializer().fields
+    SubscriptionSerializer().fields
+
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except Exception:
+            logger.exception('База данных %s недоступна', connection.alias)
+            return
+
+    from recipes.feed import get_celebrity_ids
+    from stats.services import trending_recipe_ids
+    trending_recipe_ids()
+    get_celebrity_ids()
+
+    connections.close_all()
+    _state['ready'] = True
@@ -0,0 +1,46 @@
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Воркеры по числу доступных процессу ядер (с учётом ограничений
+# контейнера), потоки покрывают ожидание базы данных
+try:
+    cpu_count = len(os.sched_getaffinity(0))
+except AttributeError:
+    cpu_count = os.cpu_count() or 1
+workers = int(os.getenv('GUNICORN_WORKERS', cpu_count * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Каждый поток держит своё постоянное соединение (CONN_MAX_AGE),
+# итого до workers * threads соединений с каждой базой. Число воркеров
+# урезается, чтобы не выйти за DB_MAX_CONNECTIONS (запас под
+# max_connections PostgreSQL с учётом миграций и админских сессий).
+db_max_connections = int(os.getenv('DB_MAX_CONNECTIONS', 80))
+workers = max(1, min(workers, db_max_connections // threads))
+worker_class = 'gthread'
+
+# Приложение загружается и прогревается (foodgram.warmup) в мастере
+# один раз, воркеры получают его через fork
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+# Метрики prometheus_client агрегируются между воркерами через файлы
+# в общем каталоге. Он очищается и создаётся при чтении конфигурации:
+# при preload_app прогрев (foodgram.warmup) пишет метрики ещё до хука
+# on_starting.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics')
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
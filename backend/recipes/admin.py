@@ -1,4 +1,8 @@
 from django.contrib import admin
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from foodgram.admin_mixins import ScalableAdminMixin
 
 from .models import (
     Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
@@ -9,36 +13,49 @@ class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     min_num = 1
     extra = 1
+    # Поиск вместо выпадающего списка из всего каталога
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'author', 'favorites_count')
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username')
-    list_filter = ('author', 'name')
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientInline,)
 
+    def get_queryset(self, request):
+        # Счётчик берётся из таблицы статистики, без COUNT на каждую строку
+        return super().get_queryset(request).annotate(
+            favorites_total=Coalesce(F('stat__favorites_count'), Value(0))
+        )
+
+    @admin.display(description='В избранном', ordering='favorites_total')
     def favorites_count(self, obj):
-        return obj.favorites.count()
-    favorites_count.short_description = 'В избранном'
+        return obj.favorites_total
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    ordering = ('name',)
 
 
-@admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class UserRecipeRelationAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
-    list_filter = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(UserRecipeRelationAdmin):
+    pass
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
-    search_fields = ('user__username', 'recipe__name')
-    list_filter = ('user', 'recipe')
+class ShoppingCartAdmin(UserRecipeRelationAdmin):
+    pass
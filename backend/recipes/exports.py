@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db.models import F, Sum
+
+from .models import RecipeIngredient
+
+logger = logging.getLogger(__name__)
+
+PDF_FONT_NAME = 'ShoppingListFont'
+# Маркеры состояния задания рядом с файлом: каталог общий для всех
+# воркеров, поэтому статус виден из любого процесса
+PENDING_SUFFIX = '.pending'
+ERROR_SUFFIX = '.error'
+
+_executor = None
+
+
+def shopping_cart_ingredients(user):
+    """Суммарные ингредиенты рецептов из списка покупок пользователя"""
+    return list(
+        RecipeIngredient.objects
+        .filter(recipe__in_shopping_cart__user=user)
+        .values(
+            name=F('ingredient__name'),
+            unit=F('ingredient__measurement_unit')
+        )
+        .annotate(amount=Sum('amount'))
+        .order_by('name')
+    )
+
+
+def cart_fingerprint(ingredients):
+    """Отпечаток содержимого списка покупок: ключ кэша PDF-файлов"""
+    payload = json.dumps(ingredients, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def artifact_path(fingerprint):
+    return os.path.join(settings.PDF_EXPORT_DIR, f'{fingerprint}.pdf')
+
+
+def marker_path(fingerprint, suffix):
+    return os.path.join(settings.PDF_EXPORT_DIR, fingerprint + suffix)
+
+
+def render_pdf(ingredients, path):
+    """Отрисовка списка покупок в PDF с атомарной записью файла"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.PDF_EXPORT_FONT)
+        )
+
+    os.makedirs(settings.PDF_EXPORT_DIR, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=settings.PDF_EXPORT_DIR, suffix='.tmp'
+    )
+    os.close(descriptor)
+    try:
+        width, height = A4
+        margin = 50
+        pdf = canvas.Canvas(temp_path, pagesize=A4)
+        pdf.setTitle('Список покупок')
+        pdf.setFont(PDF_FONT_NAME, 18)
+        pdf.drawString(margin, height - margin, 'Список покупок')
+        y = height - margin - 36
+        pdf.setFont(PDF_FONT_NAME, 12)
+        for item in ingredients:
+            if y < margin:
+                pdf.showPage()
+                pdf.setFont(PDF_FONT_NAME, 12)
+                y = height - margin
+            pdf.drawString(
+                margin,
+                y,
+                f"☐  {item['name']} ({item['unit']}) — {item['amount']}"
+            )
+            y -= 20
+        pdf.save()
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    evict_artifacts(keep=path)
+
+
+def evict_artifacts(keep=None):
+    """
+    Удаление устаревших PDF: сначала старше PDF_EXPORT_MAX_AGE,
+    затем самые давно использованные, пока каталог больше
+    PDF_EXPORT_MAX_BYTES. Файл keep (только что созданный) не удаляется.
+    """
+    try:
+        entries = [
+            entry for entry in os.scandir(settings.PDF_EXPORT_DIR)
+            if entry.is_file()
+        ]
+    except FileNotFoundError:
+        return
+    expired_before = time.time() - settings.PDF_EXPORT_MAX_AGE
+    for entry in entries:
+        if (entry.name.endswith(ERROR_SUFFIX)
+                and entry.stat().st_mtime < expired_before):
+            _remove(entry.path)
+    entries = [entry for entry in entries if entry.name.endswith('.pdf')]
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    total_size = sum(entry.stat().st_size for entry in entries)
+    for entry in entries:
+        if entry.path == keep:
+            continue
+        stat = entry.stat()
+        if (stat.st_mtime >= expired_before
+                and total_size <= settings.PDF_EXPORT_MAX_BYTES):
+            break
+        _remove(entry.path)
+        total_size -= stat.st_size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def touch_artifact(path):
+    """Отметка использования файла для вытеснения по LRU"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PDF_EXPORT_WORKERS,
+            thread_name_prefix='pdf-export'
+        )
+    return _executor
+
+
+def _is_stale(path):
+    """Маркер задания, воркер которого не успел его снять (перезапуск)"""
+    try:
+        started = os.path.getmtime(path)
+    except FileNotFoundError:
+        return False
+    return started < time.time() - settings.PDF_EXPORT_PENDING_TIMEOUT
+
+
+def enqueue_render(ingredients, fingerprint):
+    """
+    Ставит отрисовку в очередь, если она ещё не запущена ни одним
+    воркером: маркер .pending создаётся атомарно (O_EXCL).
+    """
+    os.makedirs(settings.PDF_EXPORT_DIR, exist_ok=True)
+    pending = marker_path(fingerprint, PENDING_SUFFIX)
+    if _is_stale(pending):
+        _remove(pending)
+    try:
+        os.close(os.open(pending, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return
+    _remove(marker_path(fingerprint, ERROR_SUFFIX))
+    _get_executor().submit(_render_job, ingredients, fingerprint)
+
+
+def _render_job(ingredients, fingerprint):
+    try:
+        render_pdf(ingredients, artifact_path(fingerprint))
+    except Exception as error:
+        logger.exception('Ошибка отрисовки PDF %s', fingerprint)
+        with open(marker_path(fingerprint, ERROR_SUFFIX), 'w') as marker:
+            marker.write(repr(error))
+    finally:
+        _remove(marker_path(fingerprint, PENDING_SUFFIX))
+
+
+def job_status(fingerprint):
+    """Состояние задания: 'ready', 'pending', 'failed' или None"""
+    if os.path.exists(artifact_path(fingerprint)):
+        return 'ready'
+    pending = marker_path(fingerprint, PENDING_SUFFIX)
+    if os.path.exists(pending) and not _is_stale(pending):
+        return 'pending'
+    if os.path.exists(marker_path(fingerprint, ERROR_SUFFIX)):
+        return 'failed'
+    return None
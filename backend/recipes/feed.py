@@ -0,0 +1,210 @@
+from functools import partial
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from foodgram.metrics import record_cache
+from users.models import Subscription
+
+from .models import FeedEntry, Recipe
+
+CELEBRITIES_CACHE_KEY = 'feed:celebrities'
+CELEBRITIES_CACHE_TIMEOUT = 60 * 10
+FANOUT_BATCH_SIZE = 1000
+
+
+def get_celebrity_ids():
+    """
+    Авторы, у которых подписчиков больше FEED_FANOUT_THRESHOLD.
+    Их рецепты не раскладываются по лентам, а подмешиваются при чтении.
+    """
+    celebrity_ids = cache.get(CELEBRITIES_CACHE_KEY)
+    record_cache('feed_celebrities', celebrity_ids is not None)
+    if celebrity_ids is None:
+        celebrity_ids = set(
+            Subscription.objects.values('author')
+            .annotate(followers=Count('id'))
+            .filter(followers__gt=settings.FEED_FANOUT_THRESHOLD)
+            .values_list('author', flat=True)
+        )
+        cache.set(
+            CELEBRITIES_CACHE_KEY, celebrity_ids, CELEBRITIES_CACHE_TIMEOUT
+        )
+    return celebrity_ids
+
+
+def fan_out_recipe(recipe):
+    """
+    Раскладывает новый рецепт по лентам подписчиков автора
+    и обрезает их до FEED_MAX_LENGTH записей.
+    """
+    if recipe.author_id in get_celebrity_ids():
+        return
+    follower_ids = (
+        Subscription.objects.filter(author_id=recipe.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+    batch = []
+    for user_id in follower_ids:
+        batch.append(user_id)
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            _fan_out_batch(recipe, batch)
+            batch = []
+    if batch:
+        _fan_out_batch(recipe, batch)
+
+
+def schedule_fan_out(recipe):
+    """
+    Раскладка рецепта после фиксации транзакции, в которой он создан:
+    записи ленты не держат транзакцию создания, а ошибка раскладки
+    не отменяет уже сохранённый рецепт.
+    """
+    transaction.on_commit(partial(fan_out_recipe, recipe), robust=True)
+
+
+def _fan_out_batch(recipe, user_ids):
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True
+    )
+    trim_feeds(user_ids)
+
+
+def trim_feeds(user_ids):
+    """Оставляет в лентах только FEED_MAX_LENGTH последних записей"""
+    # Окно строится только по лентам, которые стали длиннее лимита,
+    # а не по всем записям всех подписчиков пачки
+    overfull_ids = list(
+        FeedEntry.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(entries=Count('id'))
+        .filter(entries__gt=settings.FEED_MAX_LENGTH)
+        .values_list('user_id', flat=True)
+    )
+    if not overfull_ids:
+        return
+    stale_ids = list(
+        FeedEntry.objects.filter(user_id__in=overfull_ids)
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=F('user_id'),
+            order_by=F('pub_date').desc()
+        ))
+        .filter(position__gt=settings.FEED_MAX_LENGTH)
+        .values_list('id', flat=True)
+    )
+    if stale_ids:
+        FeedEntry.objects.filter(id__in=stale_ids).delete()
+
+
+def backfill_feed(user, author):
+    """Добавляет в ленту последние рецепты нового автора"""
+    if author.id not in get_celebrity_ids():
+        recipes = (
+            Recipe.objects.filter(author=author)
+            .order_by('-pub_date')
+            .values_list('id', 'pub_date')[:settings.FEED_MAX_LENGTH]
+        )
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(user=user, recipe_id=recipe_id, pub_date=pub_date)
+                for recipe_id, pub_date in recipes
+            ],
+            ignore_conflicts=True
+        )
+    trim_feeds([user.id])
+
+
+def remove_author_from_feed(user, author):
+    """Убирает из ленты рецепты автора после отписки"""
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+class FeedTimeline:
+    """
+    Лента подписок как последовательность для пагинатора.
+
+    Срез читает записи FeedEntry по индексу (user, -pub_date), сливает
+    их с рецептами знаменитостей и только затем загружает рецепты
+    страницы из recipes (queryset с нужными select/prefetch).
+    Рецепты знаменитостей берутся только из второго источника, поэтому
+    источники не пересекаются и количество совпадает с длиной ленты.
+    """
+
+    def __init__(self, user, recipes):
+        self.user = user
+        self.recipes = recipes
+        self._count = None
+        self._celebrity_authors = None
+
+    def _get_celebrity_authors(self):
+        if self._celebrity_authors is None:
+            celebrity_ids = get_celebrity_ids()
+            self._celebrity_authors = list(
+                Subscription.objects.filter(
+                    user=self.user, author_id__in=celebrity_ids
+                ).values_list('author_id', flat=True)
+            ) if celebrity_ids else []
+        return self._celebrity_authors
+
+    def _celebrity_recipes(self):
+        return Recipe.objects.filter(
+            author_id__in=self._get_celebrity_authors()
+        ).order_by('-pub_date')
+
+    def _entries(self):
+        entries = FeedEntry.objects.filter(user=self.user)
+        celebrity_authors = self._get_celebrity_authors()
+        if celebrity_authors:
+            # Автор мог стать знаменитостью после раскладки рецепта
+            entries = entries.exclude(
+                recipe__author_id__in=celebrity_authors
+            )
+        return entries
+
+    def count(self):
+        if self._count is None:
+            self._count = self._entries().count()
+            if self._get_celebrity_authors():
+                self._count += self._celebrity_recipes().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def _recipe_ids(self, stop):
+        """Первые stop рецептов ленты в порядке убывания даты"""
+        sources = [
+            self._entries().order_by('-pub_date')
+            .values_list('pub_date', 'recipe_id')[:stop]
+        ]
+        if self._get_celebrity_authors():
+            sources.append(
+                self._celebrity_recipes().values_list('pub_date', 'id')[:stop]
+            )
+        for _, recipe_id in merge(*sources, reverse=True):
+            yield recipe_id
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = list(islice(
+            self._recipe_ids(index.stop), index.start or 0, index.stop
+        ))
+        recipes = self.recipes.filter(pk__in=ids).in_bulk()
+        return [recipes[pk] for pk in ids if pk in recipes]
+
+
+def get_feed(user, recipes):
+    """Лента рецептов авторов, на которых подписан пользователь"""
+    return FeedTimeline(user, recipes)
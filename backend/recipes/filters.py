@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.db.models import Case, When
 from django_filters import rest_framework as filters
 from recipes.models import Recipe, Ingredient
+from stats.models import IngredientPrefixTop
+from stats.services import PREFIX_LENGTHS, ingredients_by_usage
 from users.models import User
 
 
@@ -31,8 +35,29 @@ class RecipeFilter(filters.FilterSet):
 
 
 class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='istartswith')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def filter_name(self, queryset, name, value):
+        """
+        Поиск по началу названия, частые ингредиенты первыми.
+        Короткие префиксы берутся из предрассчитанного топа. Если в нём
+        меньше INGREDIENT_PREFIX_TOP_K строк (совпадений мало или топ
+        ещё не построен), поиск идёт напрямую.
+        """
+        queryset = queryset.filter(name__istartswith=value)
+        if len(value) > max(PREFIX_LENGTHS):
+            return ingredients_by_usage(queryset)
+        ids = list(
+            IngredientPrefixTop.objects.filter(prefix=value.lower())
+            .values_list('ingredient_id', flat=True)
+        )
+        if len(ids) < settings.INGREDIENT_PREFIX_TOP_K:
+            return ingredients_by_usage(queryset)
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *(When(pk=pk, then=position) for position, pk in enumerate(ids)),
+            default=len(ids)
+        ))
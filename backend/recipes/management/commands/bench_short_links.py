@@ -0,0 +1,57 @@
+import time
+from statistics import median, quantiles
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from recipes.utils import encode_short_code, make_local_client
+
+
+class Command(BaseCommand):
+    help = 'Замер задержки и пропускной способности коротких ссылок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--recipes', type=int, default=100)
+
+    def handle(self, *args, **options):
+        codes = [
+            encode_short_code(recipe_id)
+            for recipe_id in Recipe.objects.values_list(
+                'id', flat=True
+            )[:options['recipes']]
+        ]
+        if not codes:
+            self.stdout.write(self.style.ERROR('Нет рецептов для замера'))
+            return
+
+        client = make_local_client()
+        # Прогрев кэша: по одному запросу на каждый код
+        for code in codes:
+            client.get(f'/s/{code}/')
+
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for index in range(options['requests']):
+                code = codes[index % len(codes)]
+                request_started = time.perf_counter()
+                response = client.get(f'/s/{code}/')
+                timings.append(time.perf_counter() - request_started)
+                if response.status_code != 302:
+                    self.stdout.write(self.style.ERROR(
+                        f'/s/{code}/ вернул {response.status_code}'
+                    ))
+                    return
+            elapsed = time.perf_counter() - started
+
+        percentiles = quantiles(timings, n=100)
+        self.stdout.write(
+            f'Запросов: {len(timings)}, '
+            f'запросов к БД: {len(queries)}\n'
+            f'p50: {median(timings) * 1000:.3f} мс, '
+            f'p99: {percentiles[98] * 1000:.3f} мс\n'
+            f'Пропускная способность: {len(timings) / elapsed:.0f} rps'
+        )
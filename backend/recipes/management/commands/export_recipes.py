@@ -0,0 +1,96 @@
+import json
+import sys
+import tarfile
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.models import Recipe, RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка рецептов в NDJSON (по рецепту на строку)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', help='Файл NDJSON, "-" для стандартного вывода'
+        )
+        parser.add_argument(
+            '--images', help='tar-архив для изображений рецептов'
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def serialize(self, recipe):
+        author = recipe.author
+        return {
+            'id': recipe.id,
+            'author': {
+                'email': author.email,
+                'username': author.username,
+                'first_name': author.first_name,
+                'last_name': author.last_name,
+            },
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'pub_date': recipe.pub_date.isoformat(),
+            'image': recipe.image.name,
+            'ingredients': [
+                {
+                    'name': item.ingredient.name,
+                    'measurement_unit': item.ingredient.measurement_unit,
+                    'amount': item.amount,
+                }
+                for item in recipe.recipe_ingredients.all()
+            ],
+        }
+
+    def handle(self, *args, **options):
+        # Ингредиенты подгружаются отдельным запросом на каждую порцию
+        recipes = (
+            Recipe.objects.order_by('id')
+            .select_related('author')
+            .prefetch_related(Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                )
+            ))
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        output = (
+            sys.stdout if options['output'] == '-'
+            else open(options['output'], 'w', encoding='utf-8')
+        )
+        # Потоковый режим tar не требует перемотки и держит в памяти
+        # только текущий файл
+        images = (
+            tarfile.open(options['images'], 'w|')
+            if options['images'] else None
+        )
+        count = 0
+        try:
+            for recipe in recipes:
+                output.write(
+                    json.dumps(self.serialize(recipe), ensure_ascii=False)
+                )
+                output.write('\n')
+                if images and recipe.image:
+                    self.add_image(images, recipe.image.name)
+                count += 1
+        finally:
+            if images:
+                images.close()
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f'Выгружено рецептов: {count}'))
+
+    def add_image(self, archive, name):
+        if not default_storage.exists(name):
+            self.stderr.write(self.style.WARNING(f'Нет файла {name}'))
+            return
+        info = tarfile.TarInfo(name)
+        info.size = default_storage.size(name)
+        with default_storage.open(name, 'rb') as file:
+            archive.addfile(info, file)
@@ -0,0 +1,229 @@
+import json
+import os
+import tarfile
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from sync.models import Change
+from sync.services import log_changes
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая загрузка рецептов из NDJSON пакетами bulk_create. '
+        'Соответствие старых и новых id пишется в файл <input>.idmap, '
+        'повторный запуск пропускает уже загруженные рецепты, в том числе '
+        'не попавшие в idmap: рецепт с тем же автором, названием и датой '
+        'публикации не создаётся повторно. '
+        'После загрузки стоит выполнить rebuild_similar_recipes '
+        'и rebuild_stats.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл NDJSON из export_recipes')
+        parser.add_argument(
+            '--images', help='tar-архив изображений из export_recipes'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['images']:
+            self.import_images(options['images'])
+
+        idmap_path = f"{options['input']}.idmap"
+        imported = self.load_idmap(idmap_path)
+        self.ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        }
+
+        created = skipped = 0
+        with open(options['input'], encoding='utf-8') as source, \
+                open(idmap_path, 'a', encoding='utf-8') as idmap:
+            records = (json.loads(line) for line in source if line.strip())
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                pending = [
+                    record for record in batch
+                    if record['id'] not in imported
+                ]
+                skipped += len(batch) - len(pending)
+                if not pending:
+                    continue
+                with transaction.atomic():
+                    mapping, found = self.import_batch(pending)
+                # Соответствие id пишется после коммита пакета. Если
+                # процесс упадёт до записи, повторный запуск найдёт
+                # рецепты пакета по естественному ключу
+                for old_id, new_id in mapping + found:
+                    idmap.write(f'{old_id} {new_id}\n')
+                idmap.flush()
+                imported.update(old_id for old_id, _ in mapping + found)
+                created += len(mapping)
+                skipped += len(found)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено рецептов: {created}, пропущено: {skipped}'
+        ))
+
+    def load_idmap(self, path):
+        if not os.path.exists(path):
+            return set()
+        with open(path, encoding='utf-8') as idmap:
+            return {int(line.split()[0]) for line in idmap if line.strip()}
+
+    def import_images(self, path):
+        count = 0
+        with tarfile.open(path, 'r|') as archive:
+            for member in archive:
+                if not member.isfile() or default_storage.exists(member.name):
+                    continue
+                default_storage.save(member.name, archive.extractfile(member))
+                count += 1
+        self.stdout.write(f'Загружено изображений: {count}')
+
+    def resolve_authors(self, records):
+        """
+        Id авторов по email из записи. Автор сопоставляется
+        с пользователем по email, затем по username: оба поля
+        уникальны, и пользователь мог сменить одно из них.
+        """
+        authors = {record['author']['email']: record['author']
+                   for record in records}
+        by_email, by_username = {}, {}
+
+        def remember(users):
+            for pk, email, username in users.values_list(
+                'id', 'email', 'username'
+            ):
+                by_email[email] = pk
+                by_username[username] = pk
+
+        remember(User.objects.filter(
+            Q(email__in=authors)
+            | Q(username__in=[author['username']
+                              for author in authors.values()])
+        ))
+        missing = {}
+        for email, author in authors.items():
+            if email not in by_email and author['username'] not in by_username:
+                missing.setdefault(author['username'], User(
+                    email=email,
+                    username=author['username'],
+                    first_name=author['first_name'],
+                    last_name=author['last_name'],
+                    password=make_password(None)
+                ))
+        if missing:
+            User.objects.bulk_create(missing.values())
+            remember(User.objects.filter(username__in=missing))
+        return {
+            email: by_email.get(email, by_username.get(author['username']))
+            for email, author in authors.items()
+        }
+
+    def existing_recipes(self, records, authors):
+        """Уже загруженные рецепты по автору, названию и дате публикации"""
+        keys = {
+            (
+                authors[record['author']['email']],
+                record['name'],
+                parse_datetime(record['pub_date'])
+            ): record['id']
+            for record in records
+        }
+        found = Recipe.objects.filter(
+            author_id__in={author_id for author_id, _, _ in keys},
+            name__in={name for _, name, _ in keys}
+        ).values_list('author_id', 'name', 'pub_date', 'id')
+        return {
+            keys[(author_id, name, pub_date)]: pk
+            for author_id, name, pub_date, pk in found
+            if (author_id, name, pub_date) in keys
+        }
+
+    def resolve_ingredients(self, records):
+        missing = {
+            (item['name'], item['measurement_unit'])
+            for record in records
+            for item in record['ingredients']
+            if (item['name'], item['measurement_unit'])
+            not in self.ingredients
+        }
+        if missing:
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in missing
+                ],
+                ignore_conflicts=True
+            )
+            created = []
+            for pk, name, unit in Ingredient.objects.filter(
+                name__in=[name for name, _ in missing]
+            ).values_list('id', 'name', 'measurement_unit'):
+                if (name, unit) not in self.ingredients:
+                    created.append(pk)
+                self.ingredients[(name, unit)] = pk
+            # bulk_create не отправляет сигналы, журнал пишется явно
+            log_changes(Change.INGREDIENT, created)
+
+    def import_batch(self, records):
+        """
+        Загрузка пакета. Возвращает пары старых и новых id созданных
+        рецептов и пары для рецептов, найденных в базе.
+        """
+        authors = self.resolve_authors(records)
+        existing = self.existing_recipes(records, authors)
+        found = [
+            (record['id'], existing[record['id']])
+            for record in records if record['id'] in existing
+        ]
+        records = [
+            record for record in records if record['id'] not in existing
+        ]
+        if not records:
+            return [], found
+        self.resolve_ingredients(records)
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author_id=authors[record['author']['email']],
+                name=record['name'],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=record['image'],
+            )
+            for record in records
+        ])
+        # auto_now_add перезаписывает дату при создании, восстанавливаем её
+        for recipe, record in zip(recipes, records):
+            recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, ['pub_date'])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=self.ingredients[
+                    (item['name'], item['measurement_unit'])
+                ],
+                amount=item['amount']
+            )
+            for recipe, record in zip(recipes, records)
+            for item in record['ingredients']
+        ])
+        log_changes(Change.RECIPE, [recipe.id for recipe in recipes])
+        return [
+            (record['id'], recipe.id)
+            for recipe, record in zip(recipes, records)
+        ], found
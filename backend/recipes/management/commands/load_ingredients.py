@@ -1,6 +1,7 @@
 import csv
 from django.core.management.base import BaseCommand
 from recipes.models import Ingredient
+from stats.services import bulk_ingredient_changes
 
 
 class Command(BaseCommand):
@@ -11,7 +12,9 @@ class Command(BaseCommand):
         file_path = '/app/data/ingredients.csv'
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
+            # Топы префиксов пересчитываются один раз после загрузки
+            with open(file_path, 'r', encoding='utf-8') as file, \
+                    bulk_ingredient_changes():
                 reader = csv.reader(file)
                 for row in reader:
                     name, measurement_unit = row
@@ -0,0 +1,62 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import RecipeIngredient, SimilarRecipe
+from recipes.similarity import jaccard
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт таблицы похожих рецептов'
+
+    def handle(self, *args, **options):
+        top_k = settings.SIMILAR_RECIPES_TOP_K
+
+        # Один потоковый проход по связям рецепт-ингредиент
+        recipe_ingredients = defaultdict(list)
+        ingredient_recipes = defaultdict(list)
+        for recipe_id, ingredient_id in (
+            RecipeIngredient.objects.order_by()
+            .values_list('recipe_id', 'ingredient_id')
+            .iterator(chunk_size=BATCH_SIZE)
+        ):
+            recipe_ingredients[recipe_id].append(ingredient_id)
+            ingredient_recipes[ingredient_id].append(recipe_id)
+
+        with transaction.atomic():
+            SimilarRecipe.objects.all().delete()
+            batch = []
+            for recipe_id, ingredient_ids in recipe_ingredients.items():
+                shared = Counter()
+                for ingredient_id in ingredient_ids:
+                    shared.update(ingredient_recipes[ingredient_id])
+                del shared[recipe_id]
+                size = len(ingredient_ids)
+                best = heapq.nlargest(
+                    top_k,
+                    (
+                        (jaccard(
+                            count, size, len(recipe_ingredients[other_id])
+                        ), other_id)
+                        for other_id, count in shared.items()
+                    )
+                )
+                batch.extend(
+                    SimilarRecipe(
+                        recipe_id=recipe_id, similar_id=other_id, score=score
+                    )
+                    for score, other_id in best
+                )
+                if len(batch) >= BATCH_SIZE:
+                    SimilarRecipe.objects.bulk_create(batch)
+                    batch = []
+            SimilarRecipe.objects.bulk_create(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {len(recipe_ingredients)}'
+        ))
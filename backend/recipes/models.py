@@ -1,5 +1,6 @@
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 
@@ -7,6 +8,7 @@ class Ingredient(models.Model):
     """Модель ингредиентов"""
     name = models.CharField('Название', max_length=200)
     measurement_unit = models.CharField('Единица измерения', max_length=200)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -17,6 +19,11 @@ class Ingredient(models.Model):
                 name='unique_ingredient'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], name='ingredient_updated_at_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -43,21 +50,22 @@ class Recipe(models.Model):
         validators=[MinValueValidator(1)]
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'], name='recipe_updated_at_idx'
+            ),
+            models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
-    def delete(self, *args, **kwargs):
-        # Удаляем изображение при удалении рецепта
-        if self.image and self.image.storage.exists(self.image.name):
-            self.image.delete(save=False)
-        super().delete(*args, **kwargs)
-
 
 class RecipeIngredient(models.Model):
     """Модель связи рецепта и ингредиента"""
@@ -104,6 +112,8 @@ class UserRecipeRelation(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт'
     )
+    # Время события для точного вычитания из оценки популярности
+    created_at = models.DateTimeField('Дата добавления', default=timezone.now)
 
     class Meta:
         abstract = True
@@ -139,3 +149,70 @@ class ShoppingCart(UserRecipeRelation):
         related_name='in_shopping_cart',
         verbose_name='Рецепт'
     )
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок (материализованная при публикации рецепта)"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+
+class SimilarRecipe(models.Model):
+    """Предрассчитанные похожие рецепты (сходство Жаккара по ингредиентам)"""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            )
+        ]
@@ -1,20 +1,30 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import (
     Ingredient, Recipe, RecipeIngredient,
     Favorite, ShoppingCart
 )
 from drf_extra_fields.fields import Base64ImageField
+from foodgram.fieldsets import SparseFieldsetsMixin
+from foodgram.loaders import BatchListSerializer, get_loader
+from foodgram.metrics import record_upload
+from stats.services import update_ingredient_usage
 from users.serializers import UserSerializer
 
+from .feed import schedule_fan_out
+from .similarity import refresh_similar, schedule
 
-class IngredientSerializer(serializers.ModelSerializer):
+
+class IngredientSerializer(SparseFieldsetsMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для ингредиентов"""
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
 
 
-class RecipeIngredientSerializer(serializers.ModelSerializer):
+class RecipeIngredientSerializer(SparseFieldsetsMixin,
+                                 serializers.ModelSerializer):
     """Сериализатор для ингредиентов в рецепте"""
     id = serializers.IntegerField(source='ingredient.id')
     name = serializers.CharField(source='ingredient.name')
@@ -37,7 +47,19 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+def user_recipes_loader(context, model, user):
+    """Какие рецепты есть у пользователя в избранном/списке покупок"""
+    def load(recipe_ids):
+        return dict.fromkeys(
+            model.objects.filter(
+                user=user, recipe_id__in=recipe_ids
+            ).values_list('recipe_id', flat=True),
+            True
+        )
+    return get_loader(context, model._meta.model_name, load, False)
+
+
+class RecipeSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """Сериализатор для рецептов"""
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
@@ -56,26 +78,51 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart', 'name', 'image', 'text',
             'cooking_time'
         )
+        list_serializer_class = BatchListSerializer
 
-    def get_is_favorited(self, obj):
-        """Проверяет, находится ли рецепт в избранном"""
+    user_relations = (
+        ('is_favorited', Favorite),
+        ('is_in_shopping_cart', ShoppingCart),
+    )
+
+    def _current_user(self):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
+            return None
+        return request.user
+
+    def prime(self, recipes):
+        """Регистрация ключей для пакетной загрузки"""
+        user = self._current_user()
+        if user is not None:
+            for name, model in self.user_relations:
+                if name in self.fields:
+                    user_recipes_loader(self.context, model, user).prime(
+                        recipe.pk for recipe in recipes
+                        if not hasattr(recipe, name)
+                    )
+        author = self.fields.get('author')
+        if author is not None:
+            author.prime([recipe.author for recipe in recipes])
+
+    def _user_relation(self, obj, name, model):
+        # Списки рецептов аннотируют флаги запросом Exists()
+        if hasattr(obj, name):
+            return getattr(obj, name)
+        user = self._current_user()
+        if user is None:
             return False
-        return Favorite.objects.filter(
-            user=request.user,
-            recipe=obj
-        ).exists()
+        return user_recipes_loader(self.context, model, user).load(obj.pk)
+
+    def get_is_favorited(self, obj):
+        """Проверяет, находится ли рецепт в избранном"""
+        return self._user_relation(obj, 'is_favorited', Favorite)
 
     def get_is_in_shopping_cart(self, obj):
         """Проверяет, находится ли рецепт в списке покупок"""
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return ShoppingCart.objects.filter(
-            user=request.user,
-            recipe=obj
-        ).exists()
+        return self._user_relation(
+            obj, 'is_in_shopping_cart', ShoppingCart
+        )
 
 
 class RecipeCreateSerializer(RecipeSerializer):
@@ -130,6 +177,7 @@ class RecipeCreateSerializer(RecipeSerializer):
             raise serializers.ValidationError(
                 'Изображение не может быть пустым.'
             )
+        record_upload('recipe', value)
         return value
 
     def validate(self, data):
@@ -152,20 +200,36 @@ class RecipeCreateSerializer(RecipeSerializer):
                 )
             )
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        return [item.ingredient_id for item in recipe_ingredients]
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        self.create_ingredients(recipe, ingredients)
+        update_ingredient_usage(
+            self.create_ingredients(recipe, ingredients), []
+        )
+        schedule_fan_out(recipe)
+        schedule(refresh_similar, recipe.id)
         return recipe
 
     def update(self, instance, validated_data):
         """Обновление рецепта"""
         if 'ingredients' in validated_data:
             ingredients = validated_data.pop('ingredients')
+            old_ids = list(
+                instance.recipe_ingredients.values_list(
+                    'ingredient_id', flat=True
+                )
+            )
             instance.recipe_ingredients.all().delete()
-            self.create_ingredients(instance, ingredients)
+            update_ingredient_usage(
+                self.create_ingredients(instance, ingredients), old_ids
+            )
+            schedule(refresh_similar, instance.id)
+        # Сохранение рецепта обновляет updated_at и пишет журнал sync
+        # один раз, сколько бы строк состава ни заменилось
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
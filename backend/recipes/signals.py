@@ -0,0 +1,47 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Recipe, SimilarRecipe
+from .similarity import refill_similar, schedule
+from .utils import short_link_cache_key
+
+
+def forget_recipe_exists(recipe_id):
+    # Сбрасывается сразу и после фиксации: параллельный запрос мог
+    # закэшировать старое значение, пока транзакция не завершилась
+    key = short_link_cache_key(recipe_id)
+    cache.delete(key)
+    transaction.on_commit(partial(cache.delete, key))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    # Id мог быть закэширован как отсутствующий до создания рецепта
+    if created:
+        forget_recipe_exists(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    # post_delete срабатывает и для удаления через QuerySet и каскад
+    forget_recipe_exists(instance.pk)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_similar_neighbours(sender, instance, **kwargs):
+    # Строки соседей удалятся каскадом вместе с рецептом
+    instance._similar_neighbours = list(
+        SimilarRecipe.objects.filter(similar_id=instance.pk)
+        .values_list('recipe_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def refill_similar_neighbours(sender, instance, **kwargs):
+    neighbours = getattr(instance, '_similar_neighbours', None)
+    if neighbours:
+        schedule(refill_similar, neighbours)
@@ -0,0 +1,181 @@
+import heapq
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Min, Window
+from django.db.models.functions import RowNumber
+
+from .models import RecipeIngredient, SimilarRecipe
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Пул потоков текущего процесса. Создаётся при первом использовании:
+    при preload_app gunicorn воркеры наследуют модуль от мастера,
+    а потоки при fork не копируются, и унаследованный пул не выполнил
+    бы ни одной задачи.
+    """
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _executor_lock:
+            if _executor_pid != pid:
+                # Один поток: пересчёты не пересекаются между собой
+                _executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='similar-recipes'
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def jaccard(shared, size, other_size):
+    return shared / (size + other_size - shared)
+
+
+def compute_similar(recipe_id):
+    """
+    Сходство рецепта со всеми рецептами, у которых есть общие ингредиенты.
+    Возвращает словарь {id рецепта: сходство}.
+    """
+    ingredient_ids = list(
+        RecipeIngredient.objects.filter(recipe_id=recipe_id)
+        .values_list('ingredient_id', flat=True)
+    )
+    if not ingredient_ids:
+        return {}
+    candidates = (
+        RecipeIngredient.objects.filter(ingredient_id__in=ingredient_ids)
+        .exclude(recipe_id=recipe_id)
+        .values_list('recipe_id')
+    )
+    shared = dict(
+        candidates.annotate(shared=Count('id')).values_list(
+            'recipe_id', 'shared'
+        ).order_by()
+    )
+    sizes = dict(
+        RecipeIngredient.objects.filter(recipe_id__in=candidates)
+        .values('recipe_id')
+        .annotate(size=Count('id'))
+        .values_list('recipe_id', 'size')
+        .order_by()
+    )
+    size = len(ingredient_ids)
+    return {
+        other_id: jaccard(count, size, sizes[other_id])
+        for other_id, count in shared.items()
+    }
+
+
+def store_top_k(recipe_id, scores):
+    """Перезаписывает top-K похожих для одного рецепта"""
+    SimilarRecipe.objects.filter(recipe_id=recipe_id).delete()
+    SimilarRecipe.objects.bulk_create([
+        SimilarRecipe(recipe_id=recipe_id, similar_id=other_id, score=score)
+        for other_id, score in heapq.nlargest(
+            settings.SIMILAR_RECIPES_TOP_K,
+            scores.items(),
+            key=lambda item: item[1]
+        )
+    ])
+
+
+def refresh_similar(recipe_id):
+    """
+    Инкрементальное обновление таблицы похожих рецептов после
+    создания или изменения рецепта: пересчитывается его собственный
+    top-K, и рецепт добавляется в top-K соседей, если проходит порог.
+    Соседи, у которых рецепт уже был в top-K, пересчитываются целиком.
+    """
+    top_k = settings.SIMILAR_RECIPES_TOP_K
+    scores = compute_similar(recipe_id)
+    store_top_k(recipe_id, scores)
+
+    stale = SimilarRecipe.objects.filter(similar_id=recipe_id)
+    dropped = set(stale.values_list('recipe_id', flat=True))
+    stale.delete()
+    for other_id in dropped:
+        store_top_k(other_id, compute_similar(other_id))
+
+    candidates = [
+        other_id for other_id in scores if other_id not in dropped
+    ]
+    neighbours = {
+        row['recipe_id']: row
+        for row in SimilarRecipe.objects.filter(recipe_id__in=candidates)
+        .values('recipe_id')
+        .annotate(count=Count('id'), lowest=Min('score'))
+        .order_by()
+    }
+    to_create = []
+    to_trim = []
+    for other_id in candidates:
+        row = neighbours.get(other_id)
+        if row is None or row['count'] < top_k:
+            to_create.append(other_id)
+        elif scores[other_id] > row['lowest']:
+            to_create.append(other_id)
+            to_trim.append(other_id)
+    SimilarRecipe.objects.bulk_create([
+        SimilarRecipe(
+            recipe_id=other_id, similar_id=recipe_id, score=scores[other_id]
+        )
+        for other_id in to_create
+    ])
+    if to_trim:
+        # Лишние строки соседей, вытесненные новым рецептом, одним запросом
+        surplus = list(
+            SimilarRecipe.objects.filter(recipe_id__in=to_trim)
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=F('recipe_id'),
+                order_by=(F('score').desc(), F('id').desc())
+            ))
+            .filter(position__gt=top_k)
+            .values_list('id', flat=True)
+        )
+        SimilarRecipe.objects.filter(id__in=surplus).delete()
+
+
+def refill_similar(recipe_ids):
+    """Пересчёт top-K рецептов, потерявших соседа при удалении"""
+    for recipe_id in recipe_ids:
+        store_top_k(recipe_id, compute_similar(recipe_id))
+
+
+def _run(function, *args):
+    close_old_connections()
+    try:
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    function(*args)
+                break
+            except IntegrityError:
+                # Рецепт удалили во время пересчёта: считаем заново
+                if attempt:
+                    raise
+    except Exception:
+        logger.exception('Ошибка пересчёта похожих рецептов')
+    finally:
+        close_old_connections()
+
+
+def schedule(function, *args):
+    """
+    Запуск пересчёта в фоновом потоке после фиксации транзакции,
+    чтобы он не задерживал ответ и видел сохранённые данные.
+    """
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, function, *args)
+    )
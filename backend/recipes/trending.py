@@ -0,0 +1,81 @@
+from itertools import islice
+
+from django.db.models import F
+
+
+class TrendingTimeline:
+    """
+    Рецепты по популярности как последовательность для пагинатора.
+
+    Начало списка - кэшированные первые TRENDING_TOP_N рецептов
+    (stats.services.trending_recipe_ids), одинаковые для всех
+    пользователей: страницы внутри него читают рецепты по id. Дальше
+    идут остальные рецепты с оценкой по индексу -trending_score,
+    затем рецепты без оценки по индексу -pub_date. Вся таблица
+    рецептов по выражению не сортируется.
+    """
+
+    def __init__(self, recipes, head_ids):
+        # recipes - отфильтрованный queryset с нужными select/prefetch
+        self.recipes = recipes
+        self._head_ids = head_ids
+        self._head = None
+        self._scored_count = None
+        self._count = None
+
+    def _get_head(self):
+        """Рецепты начала списка, прошедшие фильтры запроса"""
+        if self._head is None:
+            found = set(
+                self.recipes.filter(pk__in=self._head_ids)
+                .values_list('pk', flat=True)
+            ) if self._head_ids else set()
+            self._head = [pk for pk in self._head_ids if pk in found]
+        return self._head
+
+    def _rest(self):
+        return self.recipes.exclude(pk__in=self._get_head())
+
+    def _scored(self):
+        return self._rest().filter(
+            stat__trending_score__isnull=False
+        ).order_by(F('stat__trending_score').desc(), '-pub_date')
+
+    def _unscored(self):
+        return self._rest().filter(
+            stat__trending_score__isnull=True
+        ).order_by('-pub_date')
+
+    def _get_scored_count(self):
+        if self._scored_count is None:
+            self._scored_count = self._scored().count()
+        return self._scored_count
+
+    def count(self):
+        if self._count is None:
+            self._count = len(self._get_head()) + self._rest().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        head = self._get_head()
+        ids = list(islice(head, start, stop))
+        recipes = self.recipes.filter(pk__in=ids).in_bulk() if ids else {}
+        page = [recipes[pk] for pk in ids if pk in recipes]
+        start = max(start - len(head), 0)
+        stop -= len(head)
+        if stop <= 0:
+            return page
+        scored = list(self._scored()[start:stop])
+        page += scored
+        if start + len(scored) < stop:
+            offset = self._get_scored_count()
+            page += list(
+                self._unscored()[max(start - offset, 0):stop - offset]
+            )
+        return page
@@ -1,6 +1,17 @@
+import string
+
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Sum
 from io import BytesIO
 
+from foodgram.metrics import record_cache
+
+SHORT_LINK_ALPHABET = string.digits + string.ascii_letters
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_LINK_MISS_TIMEOUT = 60
+MAX_RECIPE_ID = 2 ** 63 - 1
+
 
 def generate_shopping_list(ingredients):
     """Генерация списка покупок"""
@@ -24,3 +35,70 @@ def generate_shopping_list(ingredients):
     shopping_list.write(''.join(content).encode('utf-8'))
     shopping_list.seek(0)
     return shopping_list
+
+
+def encode_short_code(recipe_id):
+    """Кодирование id рецепта в base62"""
+    base = len(SHORT_LINK_ALPHABET)
+    code = []
+    while True:
+        recipe_id, remainder = divmod(recipe_id, base)
+        code.append(SHORT_LINK_ALPHABET[remainder])
+        if not recipe_id:
+            break
+    return ''.join(reversed(code))
+
+
+def decode_short_code(code):
+    """Декодирование base62-кода в id рецепта, None для неверного кода"""
+    base = len(SHORT_LINK_ALPHABET)
+    recipe_id = 0
+    for char in code:
+        index = SHORT_LINK_ALPHABET.find(char)
+        if index < 0:
+            return None
+        recipe_id = recipe_id * base + index
+        if recipe_id > MAX_RECIPE_ID:
+            return None
+    return recipe_id or None
+
+
+def short_link_cache_key(recipe_id):
+    return f'short-link:{recipe_id}'
+
+
+def recipe_exists(recipe_id):
+    """
+    Проверка существования рецепта через кэш.
+    База данных запрашивается только при промахе кэша.
+    """
+    from .models import Recipe
+
+    if not 0 < recipe_id <= MAX_RECIPE_ID:
+        return False
+    key = short_link_cache_key(recipe_id)
+    exists = cache.get(key)
+    record_cache('short_link', exists is not None)
+    if exists is None:
+        exists = Recipe.objects.filter(pk=recipe_id).exists()
+        cache.set(
+            key,
+            exists,
+            SHORT_LINK_CACHE_TIMEOUT if exists else SHORT_LINK_MISS_TIMEOUT
+        )
+    return exists
+
+
+def make_local_client(client_class=None):
+    """Тестовый клиент Django для замеров из management-команд"""
+    if client_class is None:
+        from django.test import Client as client_class
+
+    host = next(
+        (
+            host for host in settings.ALLOWED_HOSTS
+            if host and host[0] not in '*.'
+        ),
+        'localhost'
+    )
+    return client_class(HTTP_HOST=host)
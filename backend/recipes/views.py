@@ -1,46 +1,79 @@
-from django.shortcuts import get_object_or_404
+import os
+
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
     AllowAny
 )
 from rest_framework.response import Response
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse
 from django.http import Http404
 from rest_framework.pagination import PageNumberPagination
 
 from .models import (
     Ingredient,
     Recipe,
+    RecipeIngredient,
     Favorite,
-    ShoppingCart
+    ShoppingCart,
+    SimilarRecipe
 )
 from .serializers import (
     IngredientSerializer,
     RecipeSerializer,
     RecipeCreateSerializer,
+    user_recipes_loader
 )
 
-from users.serializers import RecipeShortSerializer
+from users.serializers import RecipeShortSerializer, subscribed_loader
 
+from .exports import (
+    artifact_path,
+    cart_fingerprint,
+    enqueue_render,
+    job_status,
+    shopping_cart_ingredients,
+    touch_artifact
+)
+from .feed import get_feed
 from .filters import RecipeFilter, IngredientFilter
 from .permissions import IsAuthorOrReadOnly
+from .trending import TrendingTimeline
+from .utils import decode_short_code, encode_short_code, recipe_exists
 
 from .serializers import ShoppingCartSerializer
 from .serializers import FavoriteSerializer
-from django.db.models import Sum, F
+
+from foodgram.fieldsets import is_field_requested, omit_fields
+from foodgram.mixins import ConditionalGetMixin, relation_fingerprint
+from foodgram.streaming import STREAM_THROTTLE_COST, NDJSONStreamMixin
+from foodgram.throttling import pagination_cost
+from stats.services import trending_recipe_ids
+from users.models import Subscription
+
+TRENDING_ORDERING = 'trending'
+# Персональные поля и фильтры, недоступные в общем режиме (?public=1)
+PERSONAL_FIELDS = (
+    'is_favorited', 'is_in_shopping_cart', 'author.is_subscribed'
+)
+PERSONAL_FILTERS = ('is_favorited', 'is_in_shopping_cart')
+MAX_FLAGS_IDS = 100
 
 
 class CustomPagination(PageNumberPagination):
     """Пагинация с настраиваемым размером страницы"""
     page_size = 6
     page_size_query_param = 'limit'
+    max_page_size = 100
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Представление для ингредиентов"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -50,15 +83,91 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
 # Без DjangoFilterBackend падает get_ingredients_list_with_name_filter // User
     filter_backends = (filters.SearchFilter, DjangoFilterBackend)
     search_fields = ['^name']
+    throttle_costs = {'list': 2}
+    # Каталог меняется редко, сжатый ответ кэшируется по ETag
+    precompress = True
 
+    def is_public_response(self):
+        """
+        Каталог одинаков для всех пользователей: общий ETag позволяет
+        сжать ответ один раз и отдавать его из кэша всем клиентам.
+        """
+        return True
 
-class RecipeViewSet(viewsets.ModelViewSet):
+    def use_conditional_get(self):
+        # Порядок результатов поиска зависит от частоты использования
+        params = self.request.query_params
+        return 'name' not in params and 'search' not in params
+
+
+class RecipeViewSet(NDJSONStreamMixin, ConditionalGetMixin,
+                    viewsets.ModelViewSet):
     """Представление для рецептов"""
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = [IsAuthorOrReadOnly]
     pagination_class = CustomPagination
+    conditional_fields = ('updated_at', 'author__updated_at')
+    throttle_costs = {
+        'download_shopping_cart': 20,
+        'shopping_cart_pdf': 20,
+    }
+
+    def get_throttle_cost(self, request):
+        """Стоимость запроса для ограничения частоты"""
+        if self.action == 'list' and self.wants_ndjson():
+            return STREAM_THROTTLE_COST
+        if self.action in ('list', 'feed'):
+            return pagination_cost(request, self.paginator)
+        if self.action == 'shopping_cart_pdf' and request.method == 'GET':
+            # Опрос готовности и скачивание готового файла дешёвые
+            return 1
+        return self.throttle_costs.get(self.action, 1)
+
+    def get_user_state(self, user):
+        """
+        Избранное, список покупок и подписки влияют на ответ. Отпечаток
+        считается только для полей, оставшихся в ответе (?fields=).
+        """
+        return tuple(
+            (path, relation_fingerprint(model.objects.filter(user=user)))
+            for path, model in (
+                ('is_favorited', Favorite),
+                ('is_in_shopping_cart', ShoppingCart),
+                ('author.is_subscribed', Subscription),
+            )
+            if is_field_requested(self.request, path)
+        )
+
+    def is_public_response(self):
+        """
+        ?public=1: рецепты без персональных флагов, одинаковые для всех
+        пользователей. Флаги запрашиваются отдельно через flags.
+        """
+        return (
+            self.action in ('list', 'retrieve')
+            and self.request.query_params.get('public') in ('1', 'true')
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.is_public_response():
+            personal = [
+                name for name in PERSONAL_FILTERS
+                if name in request.query_params
+            ]
+            if personal:
+                raise ValidationError({
+                    name: 'Недоступно вместе с public.' for name in personal
+                })
+            omit_fields(request, PERSONAL_FIELDS)
+
+    def use_conditional_get(self):
+        # Порядок по популярности меняется без изменения самих рецептов
+        return (
+            self.request.query_params.get('ordering') != TRENDING_ORDERING
+        )
 
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от действия"""
@@ -67,9 +176,61 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeSerializer
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
+        queryset = self.with_related(Recipe.objects.all())
+        if self.request.query_params.get('ordering') == TRENDING_ORDERING:
+            return self.order_by_trending(queryset)
         return queryset.order_by('-pub_date')
 
+    def order_by_trending(self, queryset):
+        """
+        Сортировка по затухающей оценке популярности.
+        Страницы списка читаются через TrendingTimeline (см.
+        paginate_queryset), этот порядок нужен выгрузке NDJSON.
+        """
+        return queryset.order_by(
+            F('stat__trending_score').desc(nulls_last=True), '-pub_date'
+        )
+
+    def paginate_queryset(self, queryset):
+        if (
+            self.action == 'list'
+            and self.request.query_params.get('ordering') == TRENDING_ORDERING
+        ):
+            # Начало списка одинаково для всех пользователей и берётся
+            # из кэша первых TRENDING_TOP_N рецептов, остальные рецепты
+            # идут следом по индексу -trending_score
+            queryset = TrendingTimeline(queryset, trending_recipe_ids())
+        return super().paginate_queryset(queryset)
+
+    def with_related(self, queryset):
+        """
+        Подгрузка связанных данных только для полей, попавших в ответ
+        (см. ?fields= и ?omit=), чтобы не было запросов на каждый рецепт.
+        """
+        request = self.request
+        user = request.user
+        if is_field_requested(request, 'author'):
+            queryset = queryset.select_related('author')
+        if is_field_requested(request, 'ingredients'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                )
+            ))
+        if user.is_authenticated:
+            for name, model in (
+                ('is_favorited', Favorite),
+                ('is_in_shopping_cart', ShoppingCart),
+            ):
+                if is_field_requested(request, name):
+                    queryset = queryset.annotate(**{name: Exists(
+                        model.objects.filter(
+                            user=user, recipe=OuterRef('pk')
+                        )
+                    )})
+        return queryset
+
     def _handle_add_remove(self, request, pk, model, serializer_class):
         try:
             recipe = get_object_or_404(Recipe, id=pk)
@@ -119,21 +280,73 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         permission_classes=[IsAuthenticated]
     )
-    def download_shopping_cart(self, request):
-        user = request.user
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь"""
+        page = self.paginate_queryset(
+            get_feed(request.user, self.with_related(Recipe.objects.all()))
+        )
+        serializer = RecipeSerializer(
+            page, many=True, context={'request': request}
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def flags(self, request):
+        """
+        Персональные флаги пользователя для рецептов ?ids=1,2,3:
+        по одному запросу на каждую связь для всего списка.
+        """
         try:
-            ingredients = (
-                Recipe.ingredients.through.objects
-                .filter(recipe__shoppingcart__user=user)
-                .values(
-                    name=F('ingredient__name'),
-                    unit=F('ingredient__measurement_unit')
-                )
-                .annotate(amount=Sum('amount'))
-                .order_by('name')
+            ids = {
+                int(value) for value in
+                request.query_params.get('ids', '').split(',') if value
+            }
+        except ValueError:
+            raise ValidationError({'ids': 'Ожидается список чисел.'})
+        if len(ids) > MAX_FLAGS_IDS:
+            raise ValidationError(
+                {'ids': f'Не больше {MAX_FLAGS_IDS} рецептов.'}
             )
-        except Exception:
-            ingredients = []
+        authors = dict(
+            Recipe.objects.filter(pk__in=ids).values_list('pk', 'author_id')
+        )
+        context = {'request': request}
+        user = request.user
+        favorites = user_recipes_loader(context, Favorite, user)
+        cart = user_recipes_loader(context, ShoppingCart, user)
+        subscribed = subscribed_loader(context, user)
+        favorites.prime(authors)
+        cart.prime(authors)
+        subscribed.prime(
+            author_id for author_id in authors.values()
+            if author_id != user.pk
+        )
+        return Response(
+            [
+                {
+                    'id': pk,
+                    'is_favorited': favorites.load(pk),
+                    'is_in_shopping_cart': cart.load(pk),
+                    'is_subscribed': (
+                        author_id != user.pk and subscribed.load(author_id)
+                    ),
+                }
+                for pk, author_id in sorted(authors.items())
+            ],
+            headers={'Cache-Control': 'private, no-cache'}
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated]
+    )
+    def download_shopping_cart(self, request):
+        ingredients = shopping_cart_ingredients(request.user)
 
         shopping_list = ['Список покупок:\n']
         for ingredient in ingredients:
@@ -152,6 +365,75 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
         return response
 
+    @action(
+        detail=False,
+        methods=['get', 'post'],
+        url_path='download_shopping_cart/pdf',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_pdf(self, request):
+        """
+        PDF-версия списка покупок.
+        POST ставит отрисовку в фоновую очередь, GET отдаёт готовый файл
+        или сообщает, что он ещё готовится. Файлы кэшируются по
+        содержимому списка, поэтому неизменный список не перерисовывается.
+        """
+        ingredients = shopping_cart_ingredients(request.user)
+        fingerprint = cart_fingerprint(ingredients)
+        path = artifact_path(fingerprint)
+
+        if os.path.exists(path):
+            if request.method == 'POST':
+                return Response({'status': 'ready'})
+            touch_artifact(path)
+            return FileResponse(
+                open(path, 'rb'),
+                as_attachment=True,
+                filename='shopping_list.pdf',
+                content_type='application/pdf'
+            )
+
+        job = job_status(fingerprint)
+        if request.method == 'POST':
+            enqueue_render(ingredients, fingerprint)
+        elif job is None:
+            return Response(
+                {'status': 'missing'}, status=status.HTTP_404_NOT_FOUND
+            )
+        elif job == 'failed':
+            return Response(
+                {'status': 'failed'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(
+            {'status': 'pending'},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Retry-After': '1'}
+        )
+
+    @action(
+        detail=True,
+        methods=['get'],
+        permission_classes=[AllowAny]
+    )
+    def similar(self, request, pk=None):
+        """Похожие рецепты из предрассчитанной таблицы"""
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if not recipe_exists(recipe_id):
+            raise Http404
+        recipes = [
+            row.similar for row in
+            SimilarRecipe.objects.filter(recipe_id=recipe_id)
+            .select_related('similar')
+            .order_by('-score')
+        ]
+        return Response(RecipeShortSerializer(
+            recipes, many=True, context={'request': request}
+        ).data)
+
     @action(
         detail=True,
         methods=['get'],
@@ -159,12 +441,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticatedOrReadOnly]
     )
     def get_link(self, request, pk=None):
-        """Получение ссылки на рецепт"""
-        recipe = self.get_object()
+        """Получение короткой ссылки на рецепт"""
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        if not recipe_exists(recipe_id):
+            raise Http404
         absolute_url = request.build_absolute_uri(
-            f"/recipes/{recipe.id}"
+            f"/s/{encode_short_code(recipe_id)}/"
         )
         return Response(
             {"short-link": absolute_url},
             status=status.HTTP_200_OK
         )
+
+
+def short_link_redirect(request, code):
+    """Переход по короткой ссылке на страницу рецепта"""
+    recipe_id = decode_short_code(code)
+    if recipe_id is None or not recipe_exists(recipe_id):
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}')
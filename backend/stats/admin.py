@@ -0,0 +1,56 @@
+from django.contrib import admin
+
+from .models import (
+    AuthorStat, DailyRecipeStat, IngredientPrefixTop, IngredientStat,
+    RecipeStat
+)
+
+
+class ReadOnlyStatAdmin(admin.ModelAdmin):
+    """Статистика обновляется автоматически и не редактируется вручную"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(IngredientStat)
+class IngredientStatAdmin(ReadOnlyStatAdmin):
+    list_display = ('ingredient', 'recipes_count')
+    list_select_related = ('ingredient',)
+    search_fields = ('ingredient__name',)
+    ordering = ('-recipes_count',)
+
+
+@admin.register(RecipeStat)
+class RecipeStatAdmin(ReadOnlyStatAdmin):
+    list_display = ('recipe', 'favorites_count', 'carts_count')
+    list_select_related = ('recipe',)
+    search_fields = ('recipe__name',)
+    ordering = ('-favorites_count',)
+
+
+@admin.register(AuthorStat)
+class AuthorStatAdmin(ReadOnlyStatAdmin):
+    list_display = ('author', 'followers_count')
+    list_select_related = ('author',)
+    search_fields = ('author__username',)
+    ordering = ('-followers_count',)
+
+
+@admin.register(DailyRecipeStat)
+class DailyRecipeStatAdmin(ReadOnlyStatAdmin):
+    list_display = ('date', 'recipes_count')
+    date_hierarchy = 'date'
+
+
+@admin.register(IngredientPrefixTop)
+class IngredientPrefixTopAdmin(ReadOnlyStatAdmin):
+    list_display = ('prefix', 'position', 'ingredient')
+    list_select_related = ('ingredient',)
+    search_fields = ('prefix',)
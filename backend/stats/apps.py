@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class StatsConfig(AppConfig):
+    name = 'stats'
+    verbose_name = 'Статистика'
+
+    def ready(self):
+        from . import signals  # noqa: F401
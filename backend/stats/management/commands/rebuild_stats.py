@@ -0,0 +1,119 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from stats.models import (
+    AuthorStat, DailyRecipeStat, IngredientStat, RecipeStat
+)
+from stats.services import rebuild_prefix_tops, trending_scores
+from users.models import Subscription
+
+BATCH_SIZE = 5000
+# Поля, которые пересчитываются, но не сравниваются: накопленная
+# оценка популярности расходится с пересчитанной на погрешность float
+RECOMPUTED_FIELDS = {
+    RecipeStat: {'trending_score': trending_scores},
+}
+
+
+def grouped(queryset, key):
+    return dict(
+        queryset.order_by().values(key).annotate(count=Count('pk'))
+        .values_list(key, 'count')
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт статистики с нуля и сравнение с инкрементально '
+        'накопленными значениями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, не перезаписывая таблицы'
+        )
+
+    def tables(self):
+        """(модель, ключ, {поле счётчика: пересчитанные значения})"""
+        return (
+            (IngredientStat, 'ingredient_id', {
+                'recipes_count': grouped(
+                    RecipeIngredient.objects, 'ingredient_id'
+                ),
+            }),
+            (RecipeStat, 'recipe_id', {
+                'favorites_count': grouped(Favorite.objects, 'recipe_id'),
+                'carts_count': grouped(ShoppingCart.objects, 'recipe_id'),
+            }),
+            (AuthorStat, 'author_id', {
+                'followers_count': grouped(
+                    Subscription.objects, 'author_id'
+                ),
+            }),
+            (DailyRecipeStat, 'date', {
+                'recipes_count': grouped(
+                    Recipe.objects.annotate(date=TruncDate('pub_date')),
+                    'date'
+                ),
+            }),
+        )
+
+    def handle(self, *args, **options):
+        total_diffs = 0
+        for model, key, expected in self.tables():
+            fields = list(expected)
+            recomputed = {
+                field: compute()
+                for field, compute in RECOMPUTED_FIELDS.get(model, {}).items()
+            }
+            keys = set().union(*expected.values(), *recomputed.values())
+            actual = {
+                row[0]: dict(zip(fields, row[1:]))
+                for row in model.objects.values_list(key, *fields)
+            }
+            keys |= set(actual)
+            diffs = 0
+            for item in sorted(keys, key=str):
+                rebuilt = {
+                    field: expected[field].get(item, 0) for field in fields
+                }
+                stored = actual.get(item, dict.fromkeys(fields, 0))
+                if rebuilt != stored:
+                    diffs += 1
+                    self.stdout.write(
+                        f'{model.__name__} {item}: '
+                        f'накоплено {stored}, пересчитано {rebuilt}'
+                    )
+            total_diffs += diffs
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: расхождений {diffs}'
+            )
+            if options['dry_run']:
+                continue
+            with transaction.atomic():
+                model.objects.all().delete()
+                model.objects.bulk_create(
+                    (
+                        model(**{key: item}, **{
+                            field: values.get(item)
+                            for field, values in recomputed.items()
+                        }, **{
+                            field: expected[field].get(item, 0)
+                            for field in fields
+                        })
+                        for item in keys
+                        if any(expected[field].get(item) for field in fields)
+                        or any(item in values
+                               for values in recomputed.values())
+                    ),
+                    batch_size=BATCH_SIZE
+                )
+        if not options['dry_run']:
+            rebuild_prefix_tops()
+        style = self.style.SUCCESS if not total_diffs else self.style.WARNING
+        self.stdout.write(style(f'Всего расхождений: {total_diffs}'))
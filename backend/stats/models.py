@@ -0,0 +1,109 @@
+from django.db import models
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+
+class IngredientStat(models.Model):
+    """Сколько рецептов используют ингредиент"""
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stat',
+        verbose_name='Ингредиент'
+    )
+    recipes_count = models.PositiveIntegerField('Рецептов', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика ингредиента'
+        verbose_name_plural = 'Статистика ингредиентов'
+        indexes = [
+            models.Index(
+                fields=['-recipes_count'], name='ingredient_stat_count_idx'
+            )
+        ]
+
+
+class RecipeStat(models.Model):
+    """Сколько раз рецепт добавлен в избранное и список покупок"""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stat',
+        verbose_name='Рецепт'
+    )
+    favorites_count = models.PositiveIntegerField('В избранном', default=0)
+    carts_count = models.PositiveIntegerField('В списках покупок', default=0)
+    # Логарифм затухающей суммы событий относительно TRENDING_EPOCH,
+    # см. stats.services.record_trending_event
+    trending_score = models.FloatField('Популярность', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Статистика рецепта'
+        verbose_name_plural = 'Статистика рецептов'
+        indexes = [
+            models.Index(
+                fields=['-favorites_count'], name='recipe_stat_favorites_idx'
+            ),
+            models.Index(
+                fields=['-trending_score'], name='recipe_stat_trending_idx'
+            ),
+        ]
+
+
+class AuthorStat(models.Model):
+    """Число подписчиков автора"""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stat',
+        verbose_name='Автор'
+    )
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+        indexes = [
+            models.Index(
+                fields=['-followers_count'], name='author_stat_followers_idx'
+            )
+        ]
+
+
+class DailyRecipeStat(models.Model):
+    """Число рецептов, опубликованных за день"""
+    date = models.DateField('Дата', primary_key=True)
+    recipes_count = models.PositiveIntegerField('Рецептов', default=0)
+
+    class Meta:
+        verbose_name = 'Рецепты за день'
+        verbose_name_plural = 'Рецепты по дням'
+        ordering = ['-date']
+
+
+class IngredientPrefixTop(models.Model):
+    """
+    Самые используемые ингредиенты для коротких префиксов названия.
+    Одно- и двухбуквенные запросы автодополнения читаются отсюда.
+    """
+    prefix = models.CharField('Префикс', max_length=2)
+    position = models.PositiveSmallIntegerField('Место')
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный ингредиент по префиксу'
+        verbose_name_plural = 'Популярные ингредиенты по префиксам'
+        ordering = ['prefix', 'position']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['prefix', 'position'], name='unique_prefix_position'
+            )
+        ]
@@ -0,0 +1,278 @@
+import math
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Coalesce, Exp, Greatest, Least, Ln
+from django.utils.timezone import now
+
+from foodgram.metrics import record_cache
+
+# Точка отсчёта для затухания популярности. Вклад события растёт
+# экспоненциально со временем события, поэтому старые оценки не нужно
+# периодически пересчитывать: порядок рецептов при этом тот же, что и
+# у оценок, затухающих от текущего момента.
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TRENDING_CACHE_KEY = 'trending_recipe_ids'
+# Вес событий в оценке популярности по имени модели связи
+TRENDING_WEIGHTS = {
+    'favorite': 1.0,
+    'shoppingcart': 0.5,
+}
+# Длины префиксов, для которых хранится предрассчитанный топ
+PREFIX_LENGTHS = (1, 2)
+
+_prefix_tops_deferred = ContextVar('prefix_tops_deferred', default=False)
+
+
+def increment(model, key_field, keys, field, delta=1):
+    """
+    Атомарное изменение счётчика field у строк с ключами keys.
+    При увеличении отсутствующие строки создаются, при уменьшении
+    не создаются (объект мог быть удалён каскадно), а значение не
+    опускается ниже нуля: строка могла появиться уже после события,
+    которое теперь отменяется.
+    """
+    keys = set(keys)
+    if not keys or not delta:
+        return
+    lookup = {f'{key_field}__in': keys}
+    if delta < 0:
+        model.objects.filter(**lookup).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+        return
+    model.objects.filter(**lookup).update(**{field: F(field) + delta})
+    existing = set(
+        model.objects.filter(**lookup).values_list(key_field, flat=True)
+    )
+    for key in keys - existing:
+        try:
+            with transaction.atomic():
+                model.objects.create(**{key_field: key, field: delta})
+        except IntegrityError:
+            # Строку параллельно создал другой запрос
+            model.objects.filter(**{key_field: key}).update(
+                **{field: F(field) + delta}
+            )
+
+
+def update_ingredient_usage(added_ids, removed_ids):
+    """Учёт ингредиентов, добавленных в рецепт и убранных из него"""
+    from .models import IngredientStat
+
+    added_ids, removed_ids = set(added_ids), set(removed_ids)
+    increment(
+        IngredientStat, 'ingredient_id', added_ids - removed_ids,
+        'recipes_count', 1
+    )
+    increment(
+        IngredientStat, 'ingredient_id', removed_ids - added_ids,
+        'recipes_count', -1
+    )
+    refresh_prefix_tops(added_ids ^ removed_ids)
+
+
+def name_prefixes(names):
+    return {
+        name[:length].lower()
+        for name in names for length in PREFIX_LENGTHS
+        if len(name) >= length
+    }
+
+
+def ingredients_by_usage(queryset):
+    """Ингредиенты по убыванию числа рецептов, затем по алфавиту"""
+    return queryset.annotate(
+        usage=Coalesce(F('stat__recipes_count'), 0)
+    ).order_by('-usage', 'name')
+
+
+def rebuild_prefix_tops(prefixes=None):
+    """
+    Пересчёт топа ингредиентов для префиксов, по умолчанию для всех.
+    Сохранение и удаление ингредиента через ORM пересчитывает его
+    префиксы (stats.signals), массовая загрузка (load_ingredients
+    через bulk_ingredient_changes) и rebuild_stats - таблицу целиком.
+    """
+    from recipes.models import Ingredient
+
+    from .models import IngredientPrefixTop
+
+    rows = IngredientPrefixTop.objects.all()
+    if prefixes is None:
+        prefixes = name_prefixes(
+            Ingredient.objects.values_list('name', flat=True).iterator()
+        )
+    else:
+        rows = rows.filter(prefix__in=prefixes)
+    top = []
+    for prefix in prefixes:
+        top.extend(
+            IngredientPrefixTop(
+                prefix=prefix, position=position, ingredient_id=pk
+            )
+            for position, pk in enumerate(
+                ingredients_by_usage(
+                    Ingredient.objects.filter(name__istartswith=prefix)
+                ).values_list('pk', flat=True)[
+                    :settings.INGREDIENT_PREFIX_TOP_K
+                ]
+            )
+        )
+    with transaction.atomic():
+        rows.delete()
+        IngredientPrefixTop.objects.bulk_create(top)
+
+
+def prefix_tops_deferred():
+    """Идёт ли массовая загрузка ингредиентов (bulk_ingredient_changes)"""
+    return _prefix_tops_deferred.get()
+
+
+@contextmanager
+def bulk_ingredient_changes():
+    """
+    Массовое сохранение ингредиентов: сигналы не пересчитывают топы
+    префиксов после каждого сохранения, таблица пересчитывается
+    целиком один раз в конце.
+    """
+    token = _prefix_tops_deferred.set(True)
+    try:
+        yield
+    finally:
+        _prefix_tops_deferred.reset(token)
+    rebuild_prefix_tops()
+
+
+def refresh_prefix_tops(ingredient_ids):
+    """
+    Пересчёт только тех префиксов, топ которых мог измениться:
+    ингредиент уже в топе, топ неполный или ингредиент обогнал
+    последнее место.
+    """
+    from recipes.models import Ingredient
+
+    from .models import IngredientPrefixTop
+
+    if not ingredient_ids:
+        return
+    changed = {}
+    for pk, name, usage in ingredients_by_usage(
+        Ingredient.objects.filter(pk__in=ingredient_ids)
+    ).values_list('pk', 'name', 'usage'):
+        for prefix in name_prefixes([name]):
+            changed.setdefault(prefix, {})[pk] = usage
+    tops = {}
+    for prefix, pk, usage in IngredientPrefixTop.objects.filter(
+        prefix__in=changed
+    ).values_list(
+        'prefix', 'ingredient_id',
+        Coalesce(F('ingredient__stat__recipes_count'), 0)
+    ):
+        tops.setdefault(prefix, {})[pk] = usage
+    stale = []
+    for prefix, usages in changed.items():
+        top = tops.get(prefix, {})
+        if (len(top) < settings.INGREDIENT_PREFIX_TOP_K
+                or top.keys() & usages.keys()
+                or max(usages.values()) > min(top.values())):
+            stale.append(prefix)
+    if stale:
+        rebuild_prefix_tops(stale)
+
+
+def _trending_exponent(weight, when):
+    decay = settings.TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+    return math.log(weight) + (when - TRENDING_EPOCH).total_seconds() / decay
+
+
+def record_trending_event(recipe_id, weight, when=None):
+    """
+    Учёт события (добавления или удаления) в оценке популярности.
+    Оценка хранится как логарифм суммы exp(x) событий, поэтому
+    добавление - это logaddexp, выполняемый атомарно в базе.
+    Удаление вычитает вклад исходного события, поэтому when должно
+    быть временем этого события (created_at связи), а не моментом
+    удаления: иначе вычитается больше, чем было добавлено.
+    """
+    from .models import RecipeStat
+
+    exponent = Value(
+        _trending_exponent(abs(weight), when or now()),
+        output_field=FloatField()
+    )
+    score = F('trending_score')
+    rows = RecipeStat.objects.filter(recipe_id=recipe_id)
+    if weight < 0:
+        rows.update(trending_score=Case(
+            When(
+                trending_score__gt=exponent.value + 1e-9,
+                then=score + Ln(Value(1.0) - Exp(exponent - score))
+            ),
+            default=None,
+            output_field=FloatField()
+        ))
+        return
+    high, low = Greatest(score, exponent), Least(score, exponent)
+    added = Case(
+        When(trending_score__isnull=True, then=exponent),
+        default=high + Ln(Value(1.0) + Exp(low - high)),
+        output_field=FloatField()
+    )
+    if rows.update(trending_score=added):
+        return
+    try:
+        with transaction.atomic():
+            RecipeStat.objects.create(
+                recipe_id=recipe_id, trending_score=exponent.value
+            )
+    except IntegrityError:
+        # Строку параллельно создал другой запрос
+        rows.update(trending_score=added)
+
+
+def trending_scores():
+    """
+    Оценки популярности, пересчитанные с нуля по created_at связей
+    избранного и списка покупок. Удаление связи вычитает вклад по тому
+    же created_at, поэтому после пересчёта удаления точны и для связей,
+    получивших дату миграции, а не время исходного события.
+    """
+    from recipes.models import Favorite, ShoppingCart
+
+    scores = {}
+    for model in (Favorite, ShoppingCart):
+        weight = TRENDING_WEIGHTS[model._meta.model_name]
+        events = model.objects.values_list('recipe_id', 'created_at')
+        for recipe_id, created_at in events.iterator():
+            exponent = _trending_exponent(weight, created_at)
+            score = scores.get(recipe_id)
+            if score is None:
+                scores[recipe_id] = exponent
+            else:
+                high, low = max(score, exponent), min(score, exponent)
+                scores[recipe_id] = high + math.log1p(math.exp(low - high))
+    return scores
+
+
+def trending_recipe_ids():
+    """Первые TRENDING_TOP_N рецептов по популярности, с кэшированием"""
+    from .models import RecipeStat
+
+    ids = cache.get(TRENDING_CACHE_KEY)
+    record_cache('trending', ids is not None)
+    if ids is None:
+        ids = list(
+            RecipeStat.objects.filter(trending_score__isnull=False)
+            .order_by('-trending_score')
+            .values_list('recipe_id', flat=True)[:settings.TRENDING_TOP_N]
+        )
+        cache.set(
+            TRENDING_CACHE_KEY, ids, settings.TRENDING_CACHE_TIMEOUT
+        )
+    return ids
@@ -0,0 +1,113 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils.timezone import localdate
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import Subscription
+
+from .models import (
+    AuthorStat,
+    DailyRecipeStat,
+    IngredientPrefixTop,
+    RecipeStat
+)
+from .services import (
+    TRENDING_WEIGHTS,
+    increment,
+    name_prefixes,
+    prefix_tops_deferred,
+    rebuild_prefix_tops,
+    record_trending_event,
+    update_ingredient_usage
+)
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'carts_count',
+}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def user_recipe_relation_created(sender, instance, created, **kwargs):
+    if created:
+        increment(
+            RecipeStat, 'recipe_id', [instance.recipe_id],
+            RECIPE_COUNTERS[sender], 1
+        )
+        record_trending_event(
+            instance.recipe_id, TRENDING_WEIGHTS[sender._meta.model_name],
+            instance.created_at
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def user_recipe_relation_deleted(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении пользователя или рецепта
+    increment(
+        RecipeStat, 'recipe_id', [instance.recipe_id],
+        RECIPE_COUNTERS[sender], -1
+    )
+    record_trending_event(
+        instance.recipe_id, -TRENDING_WEIGHTS[sender._meta.model_name],
+        instance.created_at
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        increment(
+            AuthorStat, 'author_id', [instance.author_id],
+            'followers_count', 1
+        )
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    increment(
+        AuthorStat, 'author_id', [instance.author_id], 'followers_count', -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        increment(
+            DailyRecipeStat, 'date', [localdate(instance.pub_date)],
+            'recipes_count', 1
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    increment(
+        DailyRecipeStat, 'date', [localdate(instance.pub_date)],
+        'recipes_count', -1
+    )
+    # Ингредиенты удаляются каскадно, поэтому учитываются до удаления
+    update_ingredient_usage(
+        [],
+        instance.recipe_ingredients.values_list('ingredient_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if prefix_tops_deferred():
+        return
+    prefixes = name_prefixes([instance.name])
+    if not created:
+        # Название могло измениться: топы старых префиксов тоже
+        prefixes |= set(
+            IngredientPrefixTop.objects.filter(ingredient=instance)
+            .values_list('prefix', flat=True)
+        )
+    rebuild_prefix_tops(prefixes)
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    if not prefix_tops_deferred():
+        rebuild_prefix_tops(name_prefixes([instance.name]))
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import StatsView
+
+urlpatterns = [
+    path('stats/', StatsView.as_view(), name='stats'),
+]
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils.timezone import localdate
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import AuthorStat, DailyRecipeStat, IngredientStat, RecipeStat
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+DAILY_PERIOD_DAYS = 30
+
+
+class StatsView(APIView):
+    """Сводная статистика из инкрементально обновляемых таблиц"""
+    permission_classes = [IsAdminUser]
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return DEFAULT_LIMIT
+        return min(max(limit, 1), MAX_LIMIT)
+
+    def get(self, request):
+        limit = self.get_limit(request)
+        since = localdate() - timedelta(days=DAILY_PERIOD_DAYS)
+        return Response({
+            'top_ingredients': list(
+                IngredientStat.objects.filter(recipes_count__gt=0)
+                .order_by('-recipes_count')
+                .values(
+                    'recipes_count',
+                    id=F('ingredient_id'),
+                    name=F('ingredient__name'),
+                    measurement_unit=F('ingredient__measurement_unit'),
+                )[:limit]
+            ),
+            'most_favorited_recipes': list(
+                RecipeStat.objects.filter(favorites_count__gt=0)
+                .order_by('-favorites_count')
+                .values(
+                    'favorites_count',
+                    'carts_count',
+                    id=F('recipe_id'),
+                    name=F('recipe__name'),
+                )[:limit]
+            ),
+            'most_followed_authors': list(
+                AuthorStat.objects.filter(followers_count__gt=0)
+                .order_by('-followers_count')
+                .values(
+                    'followers_count',
+                    id=F('author_id'),
+                    username=F('author__username'),
+                )[:limit]
+            ),
+            'daily_recipes': list(
+                DailyRecipeStat.objects.filter(date__gte=since)
+                .values('date', 'recipes_count')
+            ),
+        })
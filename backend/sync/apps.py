@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SyncConfig(AppConfig):
+    name = 'sync'
+    verbose_name = 'Синхронизация'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from sync.services import prune_changes
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление записей журнала синхронизации старше '
+        'SYNC_RETENTION_DAYS. Клиенты с более старым курсором '
+        'получат полную синхронизацию'
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes()
+        self.stdout.write(self.style.SUCCESS(f'Удалено записей: {deleted}'))
@@ -0,0 +1,32 @@
+from django.db import models
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений для клиентов синхронизации.
+
+    Добавляется после фиксации транзакции, изменившей объект, поэтому
+    порядок id совпадает с порядком, в котором изменения стали видны.
+    Удаление объекта тоже записывается как изменение.
+    """
+    RECIPE = 'recipe'
+    INGREDIENT = 'ingredient'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (INGREDIENT, 'Ингредиент'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField('Тип объекта', max_length=20, choices=KINDS)
+    object_id = models.PositiveBigIntegerField('ID объекта')
+    changed_at = models.DateTimeField(
+        'Дата изменения', auto_now_add=True, db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ['id']
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
@@ -0,0 +1,46 @@
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import Change
+
+
+def _record(kind, ids):
+    Change.objects.bulk_create(
+        [Change(kind=kind, object_id=pk) for pk in ids]
+    )
+
+
+def log_changes(kind, ids):
+    """
+    Запись изменённых объектов в журнал после фиксации транзакции.
+    Запись идёт вне транзакции изменения, поэтому долгая транзакция
+    не получит id меньше уже отданного клиентам курсора.
+    """
+    ids = list(ids)
+    if ids:
+        transaction.on_commit(partial(_record, kind, ids))
+
+
+def retention_start():
+    """Журнал старше этого момента удаляется prune_sync_changes"""
+    return now() - timedelta(days=settings.SYNC_RETENTION_DAYS)
+
+
+def prune_changes():
+    """
+    Удаление записей старше SYNC_RETENTION_DAYS, возвращает их число.
+    Последняя устаревшая запись остаётся границей журнала: курсор
+    перед ней устарел (sync.views.is_expired), даже если после
+    удаления в журнале не осталось других записей.
+    """
+    boundary = Change.objects.filter(
+        changed_at__lt=retention_start()
+    ).order_by('-pk').values_list('pk', flat=True).first()
+    if boundary is None:
+        return 0
+    deleted, _ = Change.objects.filter(pk__lt=boundary).delete()
+    return deleted
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from recipes.models import Ingredient, Recipe
+
+from .models import Change
+from .services import log_changes
+
+CHANGE_KINDS = {
+    Recipe: Change.RECIPE,
+    Ingredient: Change.INGREDIENT,
+}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Ingredient)
+def object_changed(sender, instance, **kwargs):
+    # post_delete срабатывает и для удаления через QuerySet и каскад
+    log_changes(CHANGE_KINDS[sender], [instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(instance)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    # Состав рецептов меняется каскадом, пока строки ещё есть
+    touch_recipes(instance)
+
+
+def touch_recipes(ingredient):
+    """
+    Рецепты с ингредиентом считаются изменёнными: состав входит
+    в ответ рецепта. Состав, заменённый через API, учитывается
+    сохранением самого рецепта в RecipeCreateSerializer.update,
+    поэтому отдельного сигнала на каждую строку RecipeIngredient нет.
+    """
+    recipes = Recipe.objects.filter(recipe_ingredients__ingredient=ingredient)
+    recipe_ids = set(recipes.values_list('pk', flat=True))
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=now())
+    log_changes(Change.RECIPE, recipe_ids)
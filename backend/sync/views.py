@@ -0,0 +1,220 @@
+import base64
+import binascii
+import json
+from collections import defaultdict
+from datetime import timedelta
+from itertools import takewhile
+
+from django.db.models import Max, Prefetch
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware, now
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.serializers import IngredientSerializer, RecipeSerializer
+
+from .models import Change
+from .services import retention_start
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+# Записи журнала моложе этого срока не отдаются: запись с меньшим id
+# может ещё не зафиксироваться, и клиент пропустил бы её. Журнал
+# пишется короткими транзакциями после фиксации изменений, поэтому
+# окно не зависит от длительности самих изменений.
+SETTLE_PERIOD = timedelta(seconds=1)
+SNAPSHOT_STREAMS = ('recipes', 'ingredients')
+
+
+def recipes_queryset():
+    return Recipe.objects.select_related('author').prefetch_related(
+        Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        )
+    )
+
+
+def first_after(queryset, last_pk, limit):
+    """
+    Не больше limit объектов с pk > last_pk по возрастанию pk
+    и pk последнего из них, или None, если отданы все.
+    """
+    rows = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], rows[limit - 1].pk
+
+
+def is_expired(log_id):
+    """
+    Записи журнала после log_id могли быть удалены по сроку хранения:
+    первая запись - оставленная prune_sync_changes граница, и курсор
+    указывает раньше неё.
+    """
+    first = Change.objects.order_by('pk').first()
+    return (
+        first is not None
+        and first.changed_at < retention_start()
+        and log_id + 1 < first.pk
+    )
+
+
+def encode_cursor(state):
+    payload = json.dumps(state)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(value):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(value.encode()))
+        state = {'log': payload['log']}
+        for stream in SNAPSHOT_STREAMS:
+            state[stream] = payload[stream]
+        if not all(
+            value is None or (isinstance(value, int) and value >= 0)
+            for value in state.values()
+        ) or state['log'] is None:
+            raise ValueError
+    except (binascii.Error, KeyError, TypeError, ValueError):
+        raise ValidationError({'cursor': 'Некорректный курсор'})
+    return state
+
+
+class SyncView(APIView):
+    """
+    Изменения рецептов и ингредиентов.
+
+    Первый запрос без параметров отдаёт полный снимок данных,
+    с ?updated_since= - изменения после указанного момента. Ответ
+    содержит cursor, который клиент передаёт в ?cursor= и повторяет
+    запрос, пока has_more истинно. После снимка курсор указывает на
+    позицию в журнале изменений (sync.Change), куда изменения попадают
+    в порядке фиксации транзакций.
+
+    Журнал хранится SYNC_RETENTION_DAYS дней. Если изменения после
+    курсора уже удалены, ответ начинает полный снимок заново
+    и содержит full_resync: клиент должен удалить свою копию данных
+    и загрузить снимок целиком.
+    """
+    permission_classes = [AllowAny]
+
+    def get_since(self, request):
+        value = request.query_params.get('updated_since')
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            raise ValidationError(
+                {'updated_since': 'Ожидается дата и время в формате ISO 8601'}
+            )
+        return make_aware(since) if is_naive(since) else since
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            return DEFAULT_LIMIT
+        return min(max(limit, 1), MAX_LIMIT)
+
+    def start_snapshot(self):
+        # Изменения, зафиксированные во время снимка, попадут в журнал
+        # после текущей позиции и будут отданы повторно
+        last_id = Change.objects.aggregate(last=Max('pk'))['last'] or 0
+        return {'log': last_id, **dict.fromkeys(SNAPSHOT_STREAMS, 0)}
+
+    def get_state(self, request):
+        """Позиция синхронизации и нужна ли клиенту полная загрузка"""
+        value = request.query_params.get('cursor')
+        if value:
+            state = decode_cursor(value)
+        else:
+            since = self.get_since(request)
+            if since is None:
+                return self.start_snapshot(), True
+            state = {
+                'log': Change.objects.filter(changed_at__lte=since)
+                .aggregate(last=Max('pk'))['last'] or 0,
+                **dict.fromkeys(SNAPSHOT_STREAMS),
+            }
+        if is_expired(state['log']):
+            return self.start_snapshot(), True
+        return state, False
+
+    def snapshot_page(self, state, limit):
+        recipes = ingredients = []
+        next_state = dict(state)
+        if state['recipes'] is not None:
+            recipes, next_state['recipes'] = first_after(
+                recipes_queryset(), state['recipes'], limit
+            )
+        if state['ingredients'] is not None:
+            ingredients, next_state['ingredients'] = first_after(
+                Ingredient.objects.all(), state['ingredients'], limit
+            )
+        has_more = any(
+            next_state[stream] is not None for stream in SNAPSHOT_STREAMS
+        )
+        return recipes, ingredients, {}, next_state, has_more
+
+    def log_page(self, state, limit):
+        rows = list(
+            Change.objects.filter(pk__gt=state['log'])
+            .order_by('pk')[:limit + 1]
+        )
+        until = now() - SETTLE_PERIOD
+        rows = list(takewhile(lambda row: row.changed_at <= until, rows))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        changed = defaultdict(set)
+        for row in rows:
+            changed[row.kind].add(row.object_id)
+        recipes = list(
+            recipes_queryset().filter(pk__in=changed[Change.RECIPE])
+            .order_by('pk')
+        )
+        ingredients = list(
+            Ingredient.objects.filter(pk__in=changed[Change.INGREDIENT])
+            .order_by('pk')
+        )
+        # Объекты из журнала, которых больше нет, удалены
+        deleted = {
+            Change.RECIPE: changed[Change.RECIPE].difference(
+                recipe.pk for recipe in recipes
+            ),
+            Change.INGREDIENT: changed[Change.INGREDIENT].difference(
+                ingredient.pk for ingredient in ingredients
+            ),
+        }
+        next_state = dict(state, log=rows[-1].pk if rows else state['log'])
+        return recipes, ingredients, deleted, next_state, has_more
+
+    def get(self, request):
+        state, full_resync = self.get_state(request)
+        limit = self.get_limit(request)
+        in_snapshot = any(
+            state[stream] is not None for stream in SNAPSHOT_STREAMS
+        )
+        page = self.snapshot_page if in_snapshot else self.log_page
+        recipes, ingredients, deleted, next_state, has_more = page(
+            state, limit
+        )
+        context = {'request': request}
+        return Response({
+            'cursor': encode_cursor(next_state),
+            'has_more': has_more,
+            'full_resync': full_resync,
+            'recipes': RecipeSerializer(
+                recipes, many=True, context=context
+            ).data,
+            'ingredients': IngredientSerializer(
+                ingredients, many=True, context=context
+            ).data,
+            'deleted': {
+                'recipes': sorted(deleted.get(Change.RECIPE, ())),
+                'ingredients': sorted(deleted.get(Change.INGREDIENT, ())),
+            },
+        })
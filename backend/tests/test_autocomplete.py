@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient
+from stats.models import IngredientPrefixTop
+from stats.services import bulk_ingredient_changes
+
+
+@override_settings(INGREDIENT_PREFIX_TOP_K=2)
+class AutocompleteTests(APITestCase):
+    """Поиск ингредиентов по короткому префиксу через топы префиксов"""
+
+    url = '/api/ingredients/'
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, prefix):
+        response = self.client.get(self.url, {'name': prefix})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()]
+
+    def test_new_ingredient_found_by_short_prefix(self):
+        Ingredient.objects.create(name='Морковь', measurement_unit='г')
+        Ingredient.objects.create(name='Мята', measurement_unit='г')
+        self.assertEqual(self.names('м'), ['Морковь', 'Мята'])
+        # Топ префикса заполнен: новый ингредиент должен попасть в него
+        Ingredient.objects.create(name='Мак', measurement_unit='г')
+        self.assertEqual(self.names('м'), ['Мак', 'Морковь'])
+        self.assertEqual(self.names('ма'), ['Мак'])
+
+    def test_bulk_changes_rebuild_once(self):
+        with mock.patch(
+            'stats.services.rebuild_prefix_tops'
+        ) as rebuild, mock.patch('stats.signals.rebuild_prefix_tops') as hook:
+            with bulk_ingredient_changes():
+                for name in ('Мак', 'Морковь', 'Мята'):
+                    Ingredient.objects.create(name=name, measurement_unit='г')
+                Ingredient.objects.filter(name='Мята').get().delete()
+        hook.assert_not_called()
+        rebuild.assert_called_once_with()
+
+    def test_bulk_changes_build_prefix_tops(self):
+        with bulk_ingredient_changes():
+            for name in ('Мак', 'Морковь', 'Мята'):
+                Ingredient.objects.create(name=name, measurement_unit='г')
+            self.assertFalse(IngredientPrefixTop.objects.exists())
+        self.assertEqual(self.names('м'), ['Мак', 'Морковь'])
+        # После загрузки сигналы снова обновляют топы
+        Ingredient.objects.create(name='Лук', measurement_unit='г')
+        self.assertEqual(self.names('л'), ['Лук'])
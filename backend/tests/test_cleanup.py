@@ -0,0 +1,65 @@
+from django.test import TestCase
+
+from cleanup.models import PendingDeletion
+from recipes.models import Recipe
+from users.models import User
+
+from .utils import create_recipe, create_user
+
+
+class MediaCleanupTests(TestCase):
+    """Заменённые и освобождённые файлы попадают в PendingDeletion"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('author')
+        cls.recipe = create_recipe(cls.user, image='recipes/old.png')
+
+    def pending(self):
+        return sorted(PendingDeletion.objects.values_list('name', flat=True))
+
+    def test_replace_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.image = 'recipes/new.png'
+            self.recipe.save()
+        self.assertEqual(self.pending(), ['recipes/old.png'])
+
+    def test_replace_deferred_image(self):
+        recipe = Recipe.objects.only('name').get(pk=self.recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.image = 'recipes/new.png'
+            recipe.save()
+        self.assertEqual(self.pending(), ['recipes/old.png'])
+
+    def test_save_without_image_change(self):
+        recipe = Recipe.objects.only('name').get(pk=self.recipe.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Новое название'
+            recipe.save()
+            self.recipe.save()
+        self.assertEqual(self.pending(), [])
+
+    def test_new_objects_read_nothing(self):
+        with self.assertNumQueries(0):
+            User(username='new', avatar='users/new.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.user, image='recipes/new.png')
+        self.assertEqual(self.pending(), [])
+
+    def test_remove_avatar(self):
+        User.objects.filter(pk=self.user.pk).update(avatar='users/old.png')
+        user = User.objects.only('username').get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.avatar = None
+            user.save()
+        self.assertEqual(self.pending(), ['users/old.png'])
+
+    def test_delete_recipe(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.only('name').get(pk=self.recipe.pk).delete()
+        self.assertEqual(self.pending(), ['recipes/old.png'])
+
+    def test_cascade_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.pending(), ['recipes/old.png'])
@@ -0,0 +1,115 @@
+from unittest import mock
+
+import brotli
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.test import APITestCase
+
+from foodgram.compression import CompressionMiddleware, choose_encoding
+from recipes.models import Ingredient
+
+from .utils import create_user
+
+
+class ChooseEncodingTests(SimpleTestCase):
+    """Выбор кодировки по Accept-Encoding"""
+
+    def test_prefers_zstd_at_equal_weight(self):
+        self.assertEqual(choose_encoding('gzip, br, zstd'), 'zstd')
+
+    def test_respects_weights(self):
+        self.assertEqual(choose_encoding('gzip;q=1, br;q=0.5'), 'gzip')
+
+    def test_zero_weight_disables_encoding(self):
+        self.assertEqual(choose_encoding('br;q=0, gzip'), 'gzip')
+
+    def test_wildcard(self):
+        self.assertEqual(choose_encoding('*;q=0.5, zstd;q=0'), 'br')
+
+    def test_unsupported_or_empty(self):
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+
+
+class CompressionMiddlewareTests(APITestCase):
+    """Сжатие ответов и кэш заранее сжатого каталога ингредиентов"""
+
+    url = '/api/ingredients/'
+
+    @classmethod
+    def setUpTestData(cls):
+        # Каталог больше COMPRESSION_MIN_SIZE
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(50)
+        )
+        cls.users = [create_user('first'), create_user('second')]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, encoding='br', **headers):
+        return self.client.get(
+            self.url, HTTP_ACCEPT_ENCODING=encoding, **headers
+        )
+
+    def test_compresses_and_varies_on_accept_encoding(self):
+        plain = self.get(encoding='')
+        response = self.get()
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+        # Сжатое представление имеет слабый ETag
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+
+    def test_small_response_is_not_compressed(self):
+        ingredient = Ingredient.objects.first()
+        response = self.client.get(
+            f'{self.url}{ingredient.id}/', HTTP_ACCEPT_ENCODING='br'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_catalogue_is_compressed_once_for_all_users(self):
+        with mock.patch('foodgram.compression.record_cache') as record:
+            responses = []
+            for user in self.users:
+                self.client.force_authenticate(user)
+                responses.append(self.get())
+        self.assertEqual(responses[0]['ETag'], responses[1]['ETag'])
+        self.assertEqual(
+            record.call_args_list,
+            [mock.call('compressed', False), mock.call('compressed', True)]
+        )
+        self.assertIn('public', responses[0]['Cache-Control'])
+
+    def test_cached_copies_are_separated_by_content_type(self):
+        json_response = self.get(HTTP_ACCEPT='application/json')
+        html_response = self.get(HTTP_ACCEPT='text/html')
+        self.assertTrue(
+            html_response['Content-Type'].startswith('text/html')
+        )
+        self.assertEqual(
+            brotli.decompress(json_response.content)[:1], b'['
+        )
+        self.assertIn(
+            b'<html', brotli.decompress(html_response.content)[:500]
+        )
+
+    def test_same_etag_with_other_content_type_is_not_shared(self):
+        request = RequestFactory().get(self.url, HTTP_ACCEPT_ENCODING='br')
+        request._precompress = True
+        middleware = CompressionMiddleware(None)
+        bodies = {}
+        for content_type, body in (
+            ('application/json', b'[' + b'1,' * 1000 + b'1]'),
+            ('text/html', b'<html>' + b'x' * 2000 + b'</html>'),
+        ):
+            response = HttpResponse(body, content_type=content_type)
+            response['ETag'] = '"same"'
+            response = middleware.process_response(request, response)
+            bodies[content_type] = brotli.decompress(response.content)
+        self.assertEqual(bodies['text/html'][:6], b'<html>')
+        self.assertEqual(bodies['application/json'][:1], b'[')
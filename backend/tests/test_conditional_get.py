@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils.http import http_date
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+
+from .utils import create_recipe, create_user
+
+
+class ConditionalGetTests(APITestCase):
+    """ETag и Last-Modified у рецептов (ConditionalGetMixin)"""
+
+    list_url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.author = create_user('author')
+        cls.recipe = create_recipe(cls.author)
+        cls.detail_url = f'/api/recipes/{cls.recipe.pk}/'
+
+    def get(self, url, user=None, **headers):
+        self.client.force_authenticate(user)
+        return self.client.get(url, headers=headers)
+
+    def test_if_none_match(self):
+        for url in (self.list_url, self.detail_url):
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                response = self.get(url, if_none_match=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        response = self.get(self.detail_url)
+        last_modified = response['Last-Modified']
+        response = self.get(self.detail_url, if_modified_since=last_modified)
+        self.assertEqual(response.status_code, 304)
+        # Last-Modified точен до секунды
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=F('updated_at') + timedelta(seconds=1)
+        )
+        response = self.get(self.detail_url, if_modified_since=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_change_invalidates_etag(self):
+        etag = self.get(self.list_url)['ETag']
+        create_recipe(self.author, 'Новый рецепт')
+        response = self.get(self.list_url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_precondition_failed(self):
+        response = self.get(self.detail_url, if_match='"other"')
+        self.assertEqual(response.status_code, 412)
+        response = self.get(
+            self.detail_url, if_unmodified_since=http_date(86400)
+        )
+        self.assertEqual(response.status_code, 412)
+        etag = self.get(self.detail_url)['ETag']
+        response = self.get(self.detail_url, if_match=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_favorite_changes_personal_response(self):
+        response = self.get(self.detail_url, self.user)
+        etag = response['ETag']
+        # Персональный ответ проверяется только по ETag
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(
+            self.get(self.detail_url, self.user, if_none_match=etag)
+            .status_code, 304
+        )
+        self.client.post(f'{self.detail_url}favorite/')
+        response = self.get(self.detail_url, self.user, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_favorited'])
+
+    def test_unrequested_flags_not_fingerprinted(self):
+        url = f'{self.detail_url}?fields=id,name'
+        etag = self.get(url, self.user)['ETag']
+        # Только агрегат валидаторов, без отпечатков связей пользователя
+        with self.assertNumQueries(1):
+            response = self.get(url, self.user, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.post(f'{self.detail_url}favorite/')
+        self.assertEqual(
+            self.get(url, self.user, if_none_match=etag).status_code, 304
+        )
+        # Запрошенный флаг добавляет отпечаток избранного
+        with self.assertNumQueries(3):
+            response = self.get(f'{self.detail_url}?fields=id,is_favorited',
+                                self.user)
+        self.assertTrue(response.json()['is_favorited'])
+
+    def test_personal_etag_differs_between_users(self):
+        self.assertNotEqual(
+            self.get(self.list_url, self.user)['ETag'],
+            self.get(self.list_url, self.author)['ETag']
+        )
+        self.assertIn('Authorization', self.get(self.list_url)['Vary'])
+
+    def test_public_response_etag(self):
+        url = f'{self.list_url}?public=1'
+        anonymous = self.get(url)
+        authenticated = self.get(url, self.user)
+        self.assertEqual(anonymous['ETag'], authenticated['ETag'])
+        self.assertIn('public', authenticated['Cache-Control'])
+        self.assertNotIn('Authorization', authenticated['Vary'])
+        self.assertNotIn('is_favorited', authenticated.json()['results'][0])
+        response = self.get(url, self.user, if_none_match=anonymous['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_recipe(self):
+        response = self.get(f'{self.list_url}0/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
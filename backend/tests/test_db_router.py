@@ -0,0 +1,189 @@
+from copy import copy
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from foodgram.db_router import (
+    PIN_COOKIE_NAME,
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    _replica_alias
+)
+from recipes.models import Favorite, Recipe
+
+from .utils import create_recipe, create_user
+
+# База replica есть в foodgram.test_settings
+HAS_REPLICA = 'replica' in settings.DATABASES
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Выбор базы маршрутизатором"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_read_outside_request_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_read_in_safe_request_uses_replica(self):
+        token = _replica_alias.set('replica')
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica')
+        finally:
+            _replica_alias.reset(token)
+
+    def test_write_pins_rest_of_request_to_primary(self):
+        token = _replica_alias.set('replica')
+        try:
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+        finally:
+            _replica_alias.reset(token)
+
+    @override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1', 'r2'])
+    def test_one_replica_per_request(self):
+        def get_response(request):
+            reads.append({self.router.db_for_read(Recipe) for _ in range(20)})
+            return HttpResponse()
+
+        reads = []
+        middleware = ReplicaRoutingMiddleware(get_response)
+        for _ in range(20):
+            middleware(RequestFactory().get('/api/recipes/'))
+        self.assertTrue(all(len(aliases) == 1 for aliases in reads))
+        self.assertGreater(len(set().union(*reads)), 1)
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_use_primary(self):
+        def get_response(request):
+            reads.append(self.router.db_for_read(Recipe))
+            return HttpResponse()
+
+        reads = []
+        ReplicaRoutingMiddleware(get_response)(
+            RequestFactory().get('/api/recipes/')
+        )
+        self.assertEqual(reads, ['default'])
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'recipes'))
+        self.assertFalse(self.router.allow_migrate('replica', 'recipes'))
+
+
+def replicate(*objects):
+    """Копирование строк на реплику, как это сделала бы репликация"""
+    for obj in objects:
+        type(obj).objects.using('replica').bulk_create([copy(obj)])
+
+
+@skipUnless(HAS_REPLICA, 'нужна база replica: foodgram.test_settings')
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(APITestCase):
+    """
+    Чтение с реплики и закрепление клиента за основной базой на двух
+    настоящих базах. Рецепт, который ещё не дошёл до реплики, виден
+    только при чтении с основной базы.
+    """
+
+    databases = {'default', 'replica'} if HAS_REPLICA else {'default'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipe = create_recipe(cls.user, name='Реплицирован')
+        replicate(cls.user, cls.token, cls.recipe)
+        create_recipe(cls.user, name='Ещё не на реплике')
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, client):
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client
+
+    def recipe_names(self, client=None, replica_queries=None):
+        client = client or self.client
+        if replica_queries is None:
+            response = client.get('/api/recipes/')
+        else:
+            with self.assertNumQueries(replica_queries, using='replica'):
+                response = client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['name'] for recipe in response.json()['results']}
+
+    def favorite(self, recipe_id):
+        return self.client.post(f'/api/recipes/{recipe_id}/favorite/')
+
+    def test_get_reads_from_replica(self):
+        with self.assertNumQueries(0, using='default'):
+            names = self.recipe_names()
+        self.assertEqual(names, {'Реплицирован'})
+
+    def test_authenticated_get_reads_from_replica(self):
+        self.login(self.client)
+        with self.assertNumQueries(0, using='default'):
+            names = self.recipe_names()
+        self.assertEqual(names, {'Реплицирован'})
+
+    def test_write_goes_to_primary(self):
+        self.login(self.client)
+        with self.assertNumQueries(0, using='replica'):
+            response = self.favorite(self.recipe.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(
+            Favorite.objects.using('default').filter(user=self.user).exists()
+        )
+        self.assertFalse(
+            Favorite.objects.using('replica').filter(user=self.user).exists()
+        )
+
+    def test_cookie_pins_next_get_to_primary(self):
+        self.login(self.client)
+        response = self.favorite(self.recipe.id)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.client.credentials()
+        names = self.recipe_names(replica_queries=0)
+        self.assertEqual(names, {'Реплицирован', 'Ещё не на реплике'})
+
+    def test_token_pins_user_on_other_clients(self):
+        self.login(self.client)
+        self.favorite(self.recipe.id)
+        # Другое устройство того же пользователя без cookie:
+        # только поиск токена выполняется на реплике
+        other_client = self.login(self.client_class())
+        names = self.recipe_names(other_client, replica_queries=1)
+        self.assertEqual(names, {'Реплицирован', 'Ещё не на реплике'})
+
+    def test_write_does_not_pin_other_clients(self):
+        self.login(self.client)
+        self.favorite(self.recipe.id)
+        names = self.recipe_names(self.client_class())
+        self.assertEqual(names, {'Реплицирован'})
+
+    def test_failed_write_does_not_pin(self):
+        self.login(self.client)
+        response = self.favorite(self.recipe.id + 1000)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.recipe_names(), {'Реплицирован'})
+        other_client = self.login(self.client_class())
+        self.assertEqual(self.recipe_names(other_client), {'Реплицирован'})
+
+    def test_expired_cookie_reads_from_replica(self):
+        self.client.cookies[PIN_COOKIE_NAME] = '0'
+        self.assertEqual(self.recipe_names(), {'Реплицирован'})
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_from_primary(self):
+        self.login(self.client)
+        names = self.recipe_names(replica_queries=0)
+        self.assertEqual(names, {'Реплицирован', 'Ещё не на реплике'})
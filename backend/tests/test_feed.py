@@ -0,0 +1,127 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.feed import fan_out_recipe, trim_feeds
+from recipes.models import FeedEntry, Ingredient
+from users.models import Subscription, User
+
+from .utils import IMAGE, create_recipe, create_user
+
+
+class FeedTests(APITestCase):
+    """Лента из разложенных записей и рецептов знаменитостей"""
+
+    url = '/api/recipes/feed/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.celebrity = create_user('celebrity')
+        Subscription.objects.bulk_create([
+            Subscription(user=cls.reader, author=cls.author),
+            Subscription(user=cls.reader, author=cls.celebrity),
+            Subscription(user=create_user('fan'), author=cls.celebrity),
+        ])
+        # Рецепты разложены, пока у автора было мало подписчиков
+        cls.recipes = []
+        for index in range(3):
+            for author in (cls.author, cls.celebrity):
+                recipe = create_recipe(author, f'{author.username} {index}')
+                fan_out_recipe(recipe)
+                cls.recipes.append(recipe)
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.reader)
+
+    def read_feed(self, limit):
+        pages = []
+        url = f'{self.url}?limit={limit}'
+        while url:
+            data = self.client.get(url).json()
+            pages.append([recipe['id'] for recipe in data['results']])
+            url = data['next']
+        return data['count'], pages
+
+    def expected_ids(self):
+        return [
+            recipe.id for recipe in
+            sorted(self.recipes, key=lambda recipe: recipe.pub_date)[::-1]
+        ]
+
+    def test_fan_out_feed(self):
+        count, pages = self.read_feed(limit=4)
+        self.assertEqual(count, 6)
+        expected = self.expected_ids()
+        self.assertEqual(pages, [expected[:4], expected[4:]])
+
+    @override_settings(FEED_FANOUT_THRESHOLD=1)
+    def test_celebrity_recipes_are_not_counted_twice(self):
+        # Автор стал знаменитостью: его рецепты есть в обоих источниках
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 6
+        )
+        count, pages = self.read_feed(limit=4)
+        self.assertEqual(count, 6)
+        expected = self.expected_ids()
+        self.assertEqual(pages, [expected[:4], expected[4:]])
+
+    @override_settings(FEED_FANOUT_THRESHOLD=1)
+    def test_new_celebrity_recipe_is_read_on_request(self):
+        recipe = create_recipe(self.celebrity, 'Новый рецепт')
+        fan_out_recipe(recipe)
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        self.recipes.append(recipe)
+        count, pages = self.read_feed(limit=4)
+        self.assertEqual(count, 7)
+        self.assertEqual(pages[0][0], recipe.id)
+        self.assertEqual(sum(pages, []), self.expected_ids())
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_fan_out_runs_after_commit(self):
+        self.client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/recipes/', {
+                'name': 'После фиксации',
+                'text': 'Текст',
+                'cooking_time': 5,
+                'image': IMAGE,
+                'ingredients': [{'id': self.ingredient.id, 'amount': 10}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        entries = FeedEntry.objects.filter(recipe_id=response.json()['id'])
+        self.assertFalse(entries.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            list(entries.values_list('user', flat=True)), [self.reader.id]
+        )
+
+    @override_settings(FEED_MAX_LENGTH=4)
+    def test_trim_only_overfull_feeds(self):
+        fan_ids = list(FeedEntry.objects.exclude(
+            user=self.reader
+        ).values_list('id', flat=True))
+        self.assertEqual(len(fan_ids), 3)
+        trim_feeds(User.objects.values_list('id', flat=True))
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.reader)
+                 .order_by('-pub_date').values_list('recipe_id', flat=True)),
+            self.expected_ids()[:4]
+        )
+        self.assertCountEqual(
+            FeedEntry.objects.exclude(
+                user=self.reader
+            ).values_list('id', flat=True),
+            fan_ids
+        )
+        # Ленты в пределах лимита не перебираются оконной функцией
+        with self.assertNumQueries(1):
+            trim_feeds(User.objects.values_list('id', flat=True))
@@ -0,0 +1,55 @@
+from .test_query_budgets import RECIPES_PER_AUTHOR, QueryBudgetTestCase
+
+
+class FieldsetQueryTests(QueryBudgetTestCase):
+    """Поля, исключённые через ?fields= и ?omit=, не стоят запросов"""
+
+    def assertFields(self, url, fields):
+        self.client.force_authenticate(self.user)
+        results = self.client.get(url.format(limit=5)).json()['results']
+        self.assertTrue(results)
+        for item in results:
+            self.assertEqual(set(item), fields)
+
+    def assertSmaller(self, url, full_url):
+        """Ответ с ?fields= как минимум вдвое меньше полного"""
+        self.client.force_authenticate(self.user)
+        sizes = [
+            len(self.client.get(address.format(limit=20)).content)
+            for address in (url, full_url)
+        ]
+        self.assertLess(sizes[0] * 2, sizes[1], sizes)
+
+    def test_recipes_full(self):
+        self.assertPageQueries(
+            '/api/recipes/?limit={limit}', 8, authenticated=True
+        )
+
+    def test_recipes_omit_nested_field(self):
+        url = '/api/recipes/?limit={limit}&omit=author.is_subscribed'
+        self.assertPageQueries(url, 6, authenticated=True)
+        self.client.force_authenticate(self.user)
+        results = self.client.get(url.format(limit=5)).json()['results']
+        self.assertNotIn('is_subscribed', results[0]['author'])
+
+    def test_recipes_only_card_fields(self):
+        url = '/api/recipes/?limit={limit}&fields=id,name,image'
+        self.assertPageQueries(url, 3, authenticated=True)
+        self.assertFields(url, {'id', 'name', 'image'})
+        self.assertSmaller(url, '/api/recipes/?limit={limit}')
+
+    def test_subscriptions_full(self):
+        self.assertPageQueries(
+            '/api/users/subscriptions/?limit={limit}', 3, authenticated=True
+        )
+
+    def test_subscriptions_without_recipes(self):
+        url = '/api/users/subscriptions/?limit={limit}&fields=id,recipes_count'
+        self.assertPageQueries(url, 2, authenticated=True)
+        self.assertFields(url, {'id', 'recipes_count'})
+        self.assertSmaller(url, '/api/users/subscriptions/?limit={limit}')
+        self.client.force_authenticate(self.user)
+        results = self.client.get(url.format(limit=5)).json()['results']
+        self.assertEqual(
+            {item['recipes_count'] for item in results}, {RECIPES_PER_AUTHOR}
+        )
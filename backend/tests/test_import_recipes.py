@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+from .utils import create_user
+
+
+def record(pk, name, username='chef', email='chef@example.com'):
+    return {
+        'id': pk,
+        'author': {
+            'email': email,
+            'username': username,
+            'first_name': 'Имя',
+            'last_name': 'Фамилия',
+        },
+        'name': name,
+        'text': 'Текст',
+        'cooking_time': 10,
+        'pub_date': f'2024-01-0{pk}T12:00:00.123456+00:00',
+        'image': 'recipes/test.png',
+        'ingredients': [
+            {'name': 'Соль', 'measurement_unit': 'г', 'amount': 5},
+        ],
+    }
+
+
+class ImportRecipesTests(TestCase):
+    """Загрузка рецептов из NDJSON командой import_recipes"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'recipes.ndjson')
+
+    def write(self, *records):
+        with open(self.path, 'w', encoding='utf-8') as output:
+            for item in records:
+                output.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+    def run_import(self):
+        call_command('import_recipes', self.path, stdout=mock.Mock())
+
+    def idmap(self):
+        with open(f'{self.path}.idmap', encoding='utf-8') as idmap:
+            return [tuple(map(int, line.split())) for line in idmap]
+
+    def test_import(self):
+        self.write(record(1, 'Суп'), record(2, 'Каша'))
+        self.run_import()
+        self.assertEqual(User.objects.filter(username='chef').count(), 1)
+        self.assertEqual(Ingredient.objects.filter(name='Соль').count(), 1)
+        recipes = Recipe.objects.order_by('pub_date')
+        self.assertEqual([recipe.name for recipe in recipes], ['Суп', 'Каша'])
+        self.assertEqual(
+            self.idmap(), [(1, recipes[0].pk), (2, recipes[1].pk)]
+        )
+        self.assertEqual(recipes[0].recipe_ingredients.get().amount, 5)
+
+    def test_existing_username_with_other_email(self):
+        user = create_user('chef')
+        self.write(record(1, 'Суп', email='new@example.com'))
+        self.run_import()
+        self.assertEqual(Recipe.objects.get().author, user)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_existing_email_with_other_username(self):
+        user = create_user('chef')
+        self.write(record(1, 'Суп', username='renamed'))
+        self.run_import()
+        self.assertEqual(Recipe.objects.get().author, user)
+
+    def test_same_username_in_batch(self):
+        self.write(
+            record(1, 'Суп', email='first@example.com'),
+            record(2, 'Каша', email='second@example.com'),
+        )
+        self.run_import()
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_rerun_skips_imported(self):
+        self.write(record(1, 'Суп'), record(2, 'Каша'))
+        self.run_import()
+        self.run_import()
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(len(self.idmap()), 2)
+
+    def test_crash_before_idmap_is_written(self):
+        self.write(record(1, 'Суп'), record(2, 'Каша'))
+        self.run_import()
+        # Пакет зафиксирован, но соответствие id не записано
+        os.remove(f'{self.path}.idmap')
+        self.run_import()
+        recipes = Recipe.objects.order_by('pub_date')
+        self.assertEqual(recipes.count(), 2)
+        self.assertEqual(
+            self.idmap(), [(1, recipes[0].pk), (2, recipes[1].pk)]
+        )
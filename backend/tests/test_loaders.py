@@ -0,0 +1,120 @@
+from unittest import mock
+
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import (
+    APIRequestFactory,
+    APITestCase,
+    force_authenticate
+)
+
+from foodgram.loaders import BatchLoader, get_loader, reset_loaders
+from recipes.models import (
+    Favorite, Recipe, RecipeIngredient, ShoppingCart
+)
+from recipes.serializers import RecipeSerializer
+from users.models import Subscription
+
+from .utils import create_recipe, create_user
+
+
+class BatchLoaderTests(SimpleTestCase):
+    """Пакетная загрузка ключей, накопленных через prime()"""
+
+    def test_primed_keys_resolved_once(self):
+        batch_fn = mock.Mock(return_value={1: 'a', 2: 'b'})
+        loader = BatchLoader(batch_fn, default='-')
+        loader.prime([1, 2, 3])
+        self.assertEqual(
+            [loader.load(key) for key in (1, 2, 3, 1)], ['a', 'b', '-', 'a']
+        )
+        batch_fn.assert_called_once_with({1, 2, 3})
+
+    def test_unprimed_key(self):
+        batch_fn = mock.Mock(return_value={})
+        loader = BatchLoader(batch_fn, default=0)
+        self.assertEqual(loader.load(5), 0)
+        loader.prime([5])
+        self.assertEqual(loader.load(5), 0)
+        batch_fn.assert_called_once_with({5})
+
+    def test_loader_shared_per_context(self):
+        context = {}
+        loader = get_loader(context, 'name', dict)
+        self.assertIs(get_loader(context, 'name', dict), loader)
+        reset_loaders(context)
+        self.assertIsNot(get_loader(context, 'name', dict), loader)
+
+
+class SerializerBatchingTests(APITestCase):
+    """Флаги рецептов и подписки загружаются запросом на связь"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.authors = [create_user(f'author{index}') for index in range(3)]
+        cls.recipes = [
+            create_recipe(author, f'Рецепт {author.username} {index}')
+            for author in cls.authors for index in range(3)
+        ]
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        Subscription.objects.create(user=cls.user, author=cls.authors[0])
+
+    def serialize(self, recipes):
+        request = APIRequestFactory().get('/api/recipes/')
+        force_authenticate(request, self.user)
+        queryset = Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).select_related('author').prefetch_related(
+            Prefetch('recipe_ingredients',
+                     queryset=RecipeIngredient.objects.all())
+        ).order_by('pk')
+        with CaptureQueriesContext(connection) as queries:
+            data = RecipeSerializer(
+                queryset, many=True, context={'request': Request(request)}
+            ).data
+        return data, len(queries)
+
+    def test_queries_do_not_grow_with_page(self):
+        _, few = self.serialize(self.recipes[:2])
+        data, many = self.serialize(self.recipes)
+        self.assertEqual(few, many)
+        self.assertEqual(
+            [item['is_favorited'] for item in data],
+            [index % 2 == 0 for index in range(len(self.recipes))]
+        )
+        self.assertEqual(
+            [item['id'] for item in data if item['is_in_shopping_cart']],
+            [self.recipes[1].pk]
+        )
+        self.assertEqual(
+            {item['author']['id'] for item in data
+             if item['author']['is_subscribed']},
+            {self.authors[0].pk}
+        )
+
+    def test_subscriptions_recipes_limit(self):
+        for author in self.authors[1:]:
+            Subscription.objects.create(user=self.user, author=author)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2}
+        )
+        results = response.json()['results']
+        self.assertEqual(len(results), 3)
+        for item in results:
+            author_recipes = [
+                recipe.pk for recipe in self.recipes
+                if recipe.author_id == item['id']
+            ]
+            self.assertEqual(item['recipes_count'], 3)
+            # Последние опубликованные рецепты автора
+            self.assertEqual(
+                [recipe['id'] for recipe in item['recipes']],
+                author_recipes[:0:-1]
+            )
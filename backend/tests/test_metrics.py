@@ -0,0 +1,40 @@
+from django.test import TestCase, override_settings
+
+from .utils import create_user
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1', '10.1.0.0/16'])
+class MetricsAccessTests(TestCase):
+    """Доступ к /metrics только из разрешённых сетей и для сотрудников"""
+
+    url = '/metrics'
+
+    def test_anonymous_request_refused(self):
+        response = self.client.get(self.url, REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 403)
+
+    def test_forwarded_for_is_ignored(self):
+        response = self.client.get(
+            self.url, REMOTE_ADDR='203.0.113.7',
+            HTTP_X_FORWARDED_FOR='127.0.0.1'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_user_without_staff_refused(self):
+        self.client.force_login(create_user('user'))
+        response = self.client.get(self.url, REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 403)
+
+    def test_allowed_network(self):
+        for address in ('127.0.0.1', '10.1.2.3'):
+            response = self.client.get(self.url, REMOTE_ADDR=address)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'foodgram_view_latency_seconds', response.content)
+
+    def test_staff(self):
+        staff = create_user('staff')
+        staff.is_staff = True
+        staff.save()
+        self.client.force_login(staff)
+        response = self.client.get(self.url, REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 200)
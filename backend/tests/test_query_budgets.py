@@ -0,0 +1,108 @@
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from users.models import Subscription, User
+
+from .utils import create_user
+
+# Размеры страниц от стандартного до максимального (max_page_size)
+PAGE_SIZES = (6, 20, 50, 100)
+# Авторов больше максимальной страницы, чтобы она была заполнена
+AUTHORS_COUNT = 110
+RECIPES_PER_AUTHOR = 2
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Общие данные для проверок числа SQL-запросов: число запросов
+    на странице не должно зависеть от её размера.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(3)
+        )
+        password = make_password('password')
+        authors = User.objects.bulk_create(
+            User(
+                username=f'author{index}',
+                email=f'author{index}@example.com',
+                password=password,
+                first_name='Имя',
+                last_name='Фамилия'
+            )
+            for index in range(AUTHORS_COUNT)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, author=author) for author in authors
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {author.username}-{number}',
+                text='Текст',
+                cooking_time=10,
+                image='recipes/test.png'
+            )
+            for author in authors
+            for number in range(RECIPES_PER_AUTHOR)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=5)
+            for recipe in recipes
+            for ingredient in ingredients
+        )
+
+    def setUp(self):
+        # Кэш ограничения запросов и коротких ссылок не должен
+        # переходить между тестами
+        cache.clear()
+
+    def assertPageQueries(self, url, num, authenticated=False):
+        if authenticated:
+            self.client.force_authenticate(self.user)
+        for limit in PAGE_SIZES:
+            with self.subTest(url=url, limit=limit):
+                with self.assertNumQueries(num):
+                    response = self.client.get(url.format(limit=limit))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), limit)
+
+
+class UserQueryBudgetTests(QueryBudgetTestCase):
+    """Постоянное число запросов у списков и профилей пользователей"""
+
+    def test_list_anonymous(self):
+        self.assertPageQueries('/api/users/?limit={limit}', 3)
+
+    def test_list_authenticated(self):
+        self.assertPageQueries(
+            '/api/users/?limit={limit}', 4, authenticated=True
+        )
+
+    def test_detail_anonymous(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/users/{self.user.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_authenticated(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/users/{self.user.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_me_uses_request_user(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.json()['id'], self.user.id)
+
+    def test_subscriptions(self):
+        self.assertPageQueries(
+            '/api/users/subscriptions/?limit={limit}', 3, authenticated=True
+        )
@@ -0,0 +1,156 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes import exports
+from recipes.models import Ingredient, ShoppingCart
+
+from .utils import create_recipe, create_user
+
+
+class ShoppingCartTestCase(APITestCase):
+    """Список покупок: два рецепта с общим ингредиентом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.other = create_user('other')
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        milk = Ingredient.objects.create(name='Молоко', measurement_unit='мл')
+        cls.recipes = [
+            create_recipe(cls.user, 'Суп', [salt], amount=5),
+            create_recipe(cls.user, 'Каша', [salt, milk], amount=3),
+        ]
+        for recipe in cls.recipes:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+
+class ShoppingCartTests(ShoppingCartTestCase):
+
+    def test_aggregation(self):
+        self.assertEqual(exports.shopping_cart_ingredients(self.user), [
+            {'name': 'Молоко', 'unit': 'мл', 'amount': 3},
+            {'name': 'Соль', 'unit': 'г', 'amount': 8},
+        ])
+        self.assertEqual(exports.shopping_cart_ingredients(self.other), [])
+
+    def test_text_download(self):
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.content.decode(),
+            'Список покупок:\nМолоко - 3 мл\nСоль - 8 г\n'
+        )
+
+    def test_fingerprint_follows_contents(self):
+        before = exports.cart_fingerprint(
+            exports.shopping_cart_ingredients(self.user)
+        )
+        ShoppingCart.objects.filter(recipe=self.recipes[0]).delete()
+        self.assertNotEqual(before, exports.cart_fingerprint(
+            exports.shopping_cart_ingredients(self.user)
+        ))
+
+
+class ShoppingCartPdfTests(ShoppingCartTestCase):
+
+    url = '/api/recipes/download_shopping_cart/pdf/'
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(PDF_EXPORT_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.executor.shutdown)
+        executor = mock.patch('recipes.exports._executor', self.executor)
+        executor.start()
+        self.addCleanup(executor.stop)
+        self.fingerprint = exports.cart_fingerprint(
+            exports.shopping_cart_ingredients(self.user)
+        )
+
+    def wait(self):
+        self.executor.submit(lambda: None).result()
+
+    def marker(self, suffix):
+        return exports.marker_path(self.fingerprint, suffix)
+
+    def test_render(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Retry-After'], '1')
+        self.wait()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(
+            b'%PDF'
+        ))
+        self.assertEqual(self.client.post(self.url).json(), {
+            'status': 'ready'
+        })
+        self.assertFalse(os.path.exists(self.marker(exports.PENDING_SUFFIX)))
+
+    def test_pending_marker_shared_between_workers(self):
+        # Отрисовку уже запустил другой воркер
+        with mock.patch('recipes.exports.render_pdf') as render:
+            os.makedirs(os.path.dirname(self.marker('')), exist_ok=True)
+            open(self.marker(exports.PENDING_SUFFIX), 'w').close()
+            self.assertEqual(self.client.get(self.url).status_code, 202)
+            self.assertEqual(self.client.post(self.url).status_code, 202)
+            self.wait()
+        render.assert_not_called()
+
+    @override_settings(PDF_EXPORT_PENDING_TIMEOUT=60)
+    def test_stale_pending_marker_is_requeued(self):
+        os.makedirs(os.path.dirname(self.marker('')), exist_ok=True)
+        pending = self.marker(exports.PENDING_SUFFIX)
+        open(pending, 'w').close()
+        started = time.time() - 120
+        os.utime(pending, (started, started))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.post(self.url)
+        self.wait()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_failure(self):
+        with mock.patch(
+            'recipes.exports.render_pdf', side_effect=OSError('no font')
+        ), self.assertLogs('recipes.exports', 'ERROR'):
+            self.client.post(self.url)
+            self.wait()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {'status': 'failed'})
+        # Повторный запрос запускает отрисовку заново
+        self.assertEqual(self.client.post(self.url).status_code, 202)
+        self.wait()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_eviction(self):
+        directory = os.path.dirname(self.marker(''))
+        os.makedirs(directory, exist_ok=True)
+        old = os.path.join(directory, 'old.pdf')
+        with open(old, 'wb') as artifact:
+            artifact.write(b'0' * 100)
+        os.utime(old, (0, 0))
+        self.client.post(self.url)
+        self.wait()
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(
+            os.path.exists(exports.artifact_path(self.fingerprint))
+        )
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from recipes.utils import encode_short_code
+
+from .utils import create_recipe, create_user
+
+
+class ShortLinkTests(APITestCase):
+    """Короткие ссылки и кэш существования рецептов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+
+    def setUp(self):
+        cache.clear()
+        self.recipe = create_recipe(self.author)
+
+    def short_link(self, recipe_id):
+        return f'/s/{encode_short_code(recipe_id)}/'
+
+    def test_redirects_to_recipe(self):
+        response = self.client.get(self.short_link(self.recipe.id))
+        self.assertRedirects(
+            response, f'/recipes/{self.recipe.id}',
+            fetch_redirect_response=False
+        )
+
+    def test_unknown_code_is_not_found(self):
+        response = self.client.get(self.short_link(self.recipe.id + 1000))
+        self.assertEqual(response.status_code, 404)
+
+    def test_queryset_delete_forgets_cached_recipe(self):
+        self.client.get(self.short_link(self.recipe.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.filter(pk=self.recipe.id).delete()
+        response = self.client.get(self.short_link(self.recipe.id))
+        self.assertEqual(response.status_code, 404)
+
+    def test_author_delete_forgets_cached_recipe(self):
+        self.client.get(self.short_link(self.recipe.id))
+        self.client.get(f'/api/recipes/{self.recipe.id}/similar/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.delete()
+        response = self.client.get(self.short_link(self.recipe.id))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/similar/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_created_recipe_replaces_cached_miss(self):
+        recipe_id = self.recipe.id + 1000
+        response = self.client.get(self.short_link(recipe_id))
+        self.assertEqual(response.status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.author, id=recipe_id)
+        response = self.client.get(self.short_link(recipe_id))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+
+from recipes import similarity
+from recipes.models import Ingredient, SimilarRecipe
+
+from .utils import create_recipe, create_user
+
+
+def similar_table():
+    return {
+        (row.recipe_id, row.similar_id): round(row.score, 6)
+        for row in SimilarRecipe.objects.all()
+    }
+
+
+@override_settings(SIMILAR_RECIPES_TOP_K=2)
+class SimilarRecipesTests(TestCase):
+    """Таблица похожих рецептов: полный и инкрементальный пересчёт"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {index}',
+                                      measurement_unit='г')
+            for index in range(5)
+        ]
+        first, second, third, fourth, fifth = cls.ingredients
+        cls.recipes = [
+            create_recipe(cls.author, 'Суп', [first, second, third]),
+            create_recipe(cls.author, 'Каша', [first, second]),
+            create_recipe(cls.author, 'Салат', [third, fourth]),
+            create_recipe(cls.author, 'Пирог', [first, fifth]),
+        ]
+
+    def rebuild(self):
+        call_command('rebuild_similar_recipes', stdout=mock.Mock())
+        return similar_table()
+
+    def test_rebuild(self):
+        soup, porridge, salad, pie = (recipe.pk for recipe in self.recipes)
+        table = self.rebuild()
+        self.assertEqual(table[(soup, porridge)], round(2 / 3, 6))
+        self.assertEqual(table[(porridge, soup)], round(2 / 3, 6))
+        self.assertEqual(table[(salad, soup)], 0.25)
+        # Сохраняются только SIMILAR_RECIPES_TOP_K лучших соседей
+        self.assertEqual(
+            SimilarRecipe.objects.filter(recipe_id=soup).count(), 2
+        )
+
+    def test_refresh_matches_rebuild(self):
+        self.rebuild()
+        first, second, third, fourth, fifth = self.ingredients
+        recipe = create_recipe(self.author, 'Рагу', [second, third, fourth])
+        similarity.refresh_similar(recipe.pk)
+        self.assertEqual(similar_table(), self.rebuild())
+
+    def test_refill_after_delete(self):
+        self.rebuild()
+        neighbours = list(
+            SimilarRecipe.objects.filter(similar=self.recipes[1])
+            .values_list('recipe_id', flat=True)
+        )
+        self.recipes[1].delete()
+        similarity.refill_similar(neighbours)
+        self.assertEqual(similar_table(), self.rebuild())
+
+
+class BackgroundRunTests(TestCase):
+    """Запуск пересчёта в фоновом потоке"""
+
+    def test_retry_on_concurrent_delete(self):
+        function = mock.Mock(side_effect=[IntegrityError, None])
+        similarity._run(function, 1)
+        self.assertEqual(function.call_count, 2)
+
+    def test_second_failure_is_logged(self):
+        function = mock.Mock(side_effect=IntegrityError)
+        with self.assertLogs('recipes.similarity', 'ERROR'):
+            similarity._run(function, 1)
+        self.assertEqual(function.call_count, 2)
+
+    def test_schedule_runs_after_commit(self):
+        function = mock.Mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            similarity.schedule(function, 1)
+            function.assert_not_called()
+        # Пул однопоточный: пустая задача завершится после пересчёта
+        similarity.get_executor().submit(lambda: None).result()
+        function.assert_called_once_with(1)
+
+    @mock.patch('recipes.similarity._executor_pid', None)
+    @mock.patch('recipes.similarity._executor', None)
+    def test_executor_created_per_process(self):
+        executor = similarity.get_executor()
+        self.addCleanup(executor.shutdown)
+        self.assertIs(similarity.get_executor(), executor)
+        # Процесс-потомок после fork получает свой пул
+        with mock.patch('recipes.similarity.os.getpid', return_value=-1):
+            child = similarity.get_executor()
+        self.addCleanup(child.shutdown)
+        self.assertIsNot(child, executor)
@@ -0,0 +1,158 @@
+import io
+import tempfile
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils.timezone import localdate
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Ingredient, Recipe
+from stats.models import (
+    AuthorStat, DailyRecipeStat, IngredientStat, RecipeStat
+)
+from stats.services import increment
+from users.models import Subscription
+
+from .utils import IMAGE, create_recipe, create_user
+
+
+class StatsTests(APITestCase):
+    """Инкрементально обновляемые таблицы статистики"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.author = create_user('author')
+        cls.salt, cls.milk = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Молоко')
+        )
+        cls.recipe = create_recipe(cls.author)
+
+    def setUp(self):
+        # Изображения рецептов, созданных через API, не попадают в media/
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client.force_authenticate(self.user)
+
+    def counter(self, model, field, **lookup):
+        return model.objects.filter(**lookup).values_list(
+            field, flat=True
+        ).first()
+
+    def create_recipe(self, ingredients):
+        response = self.client.post('/api/recipes/', {
+            'name': 'Рецепт через API',
+            'text': 'Текст',
+            'cooking_time': 5,
+            'image': IMAGE,
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in ingredients
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def test_favorites_and_carts(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.client.post(f'{url}favorite/')
+        self.client.post(f'{url}shopping_cart/')
+        stat = RecipeStat.objects.get(recipe=self.recipe)
+        self.assertEqual((stat.favorites_count, stat.carts_count), (1, 1))
+        self.client.delete(f'{url}favorite/')
+        stat.refresh_from_db()
+        self.assertEqual((stat.favorites_count, stat.carts_count), (0, 1))
+
+    def test_followers(self):
+        Subscription.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.counter(
+            AuthorStat, 'followers_count', author=self.author
+        ), 1)
+        # Удаление подписчика учитывается каскадно
+        self.user.delete()
+        self.assertEqual(self.counter(
+            AuthorStat, 'followers_count', author=self.author
+        ), 0)
+
+    def test_recipe_ingredients(self):
+        recipe_id = self.create_recipe([self.salt, self.milk])
+        self.assertEqual(self.counter(
+            IngredientStat, 'recipes_count', ingredient=self.salt
+        ), 1)
+        response = self.client.patch(f'/api/recipes/{recipe_id}/', {
+            'ingredients': [{'id': self.milk.id, 'amount': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.counter(
+            IngredientStat, 'recipes_count', ingredient=self.salt
+        ), 0)
+        self.assertEqual(self.counter(
+            IngredientStat, 'recipes_count', ingredient=self.milk
+        ), 1)
+        Recipe.objects.filter(pk=recipe_id).delete()
+        self.assertEqual(self.counter(
+            IngredientStat, 'recipes_count', ingredient=self.milk
+        ), 0)
+
+    def test_daily_recipes(self):
+        today = localdate()
+        count = self.counter(DailyRecipeStat, 'recipes_count', date=today)
+        recipe = create_recipe(self.author, 'Ещё рецепт')
+        self.assertEqual(self.counter(
+            DailyRecipeStat, 'recipes_count', date=today
+        ), count + 1)
+        recipe.delete()
+        self.assertEqual(self.counter(
+            DailyRecipeStat, 'recipes_count', date=today
+        ), count)
+
+    def test_decrement_clamped_at_zero(self):
+        increment(RecipeStat, 'recipe_id', [self.recipe.pk], 'carts_count')
+        for _ in range(2):
+            increment(
+                RecipeStat, 'recipe_id', [self.recipe.pk], 'carts_count', -1
+            )
+        self.assertEqual(self.counter(
+            RecipeStat, 'carts_count', recipe=self.recipe
+        ), 0)
+        # Уменьшение не создаёт строк
+        increment(AuthorStat, 'author_id', [self.user.pk], 'followers_count',
+                  -1)
+        self.assertFalse(AuthorStat.objects.filter(author=self.user).exists())
+
+    def test_rebuild_stats(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        RecipeStat.objects.filter(recipe=self.recipe).update(
+            favorites_count=5
+        )
+        output = io.StringIO()
+        call_command('rebuild_stats', '--dry-run', stdout=output)
+        self.assertIn('расхождений 1', output.getvalue())
+        self.assertEqual(self.counter(
+            RecipeStat, 'favorites_count', recipe=self.recipe
+        ), 5)
+        call_command('rebuild_stats', stdout=io.StringIO())
+        self.assertEqual(self.counter(
+            RecipeStat, 'favorites_count', recipe=self.recipe
+        ), 1)
+
+    def test_stats_view(self):
+        self.assertEqual(self.client.get('/api/stats/').status_code, 403)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        self.user.is_staff = True
+        self.user.save()
+        data = self.client.get('/api/stats/').json()
+        self.assertEqual(data['most_favorited_recipes'], [{
+            'id': self.recipe.pk,
+            'name': self.recipe.name,
+            'favorites_count': 1,
+            'carts_count': 0,
+        }])
+        self.assertEqual(
+            data['daily_recipes'],
+            [{'date': localdate().isoformat(), 'recipes_count': 1}]
+        )
@@ -0,0 +1,108 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from foodgram.throttling import CostRateThrottle
+from recipes.models import Favorite
+from users.models import Subscription
+
+from .utils import create_recipe, create_user
+
+NDJSON = 'application/x-ndjson'
+
+
+class NDJSONStreamingTests(APITestCase):
+    """Списки в режиме Accept: application/x-ndjson"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.authors = [create_user(f'author{index}') for index in range(3)]
+        cls.recipes = [
+            create_recipe(author, f'Рецепт {author.username} {index}')
+            for author in cls.authors for index in range(3)
+        ]
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        for author in cls.authors:
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def stream(self, url, **params):
+        response = self.client.get(url, params, HTTP_ACCEPT=NDJSON)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], NDJSON)
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.endswith('\n'))
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_recipes_without_pagination(self):
+        rows = self.stream('/api/recipes/')
+        # Больше стандартной страницы из 6 рецептов
+        self.assertEqual(
+            sorted(row['id'] for row in rows),
+            sorted(recipe.pk for recipe in self.recipes)
+        )
+        self.assertEqual(
+            [row['id'] for row in rows if row['is_favorited']],
+            [self.recipes[0].pk]
+        )
+
+    def test_filters_and_fields(self):
+        author = self.authors[1]
+        rows = self.stream(
+            '/api/recipes/', author=author.pk, fields='id,name'
+        )
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({tuple(row) for row in rows}, {('id', 'name')})
+
+    @mock.patch('foodgram.streaming.CHUNK_SIZE', 3)
+    def test_queries_per_chunk(self):
+        author = self.authors[0]
+        counts = []
+        # 4 и 6 рецептов читаются одинаковым числом порций
+        for total in (4, 6):
+            for _ in range(total - author.recipes.count()):
+                create_recipe(author, 'Ещё рецепт')
+            with CaptureQueriesContext(connection) as queries:
+                rows = self.stream('/api/recipes/', author=author.pk)
+            self.assertEqual(len(rows), total)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_subscriptions(self):
+        rows = self.stream(
+            '/api/users/subscriptions/', recipes_limit=1
+        )
+        self.assertEqual(
+            sorted(row['id'] for row in rows),
+            sorted(author.pk for author in self.authors)
+        )
+        for row in rows:
+            self.assertEqual(len(row['recipes']), 1)
+            self.assertEqual(row['recipes_count'], 3)
+
+    def test_error_is_single_line(self):
+        response = self.client.get(
+            '/api/recipes/', {'public': 1, 'is_favorited': 1},
+            HTTP_ACCEPT=NDJSON
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content.count(b'\n'), 1)
+        self.assertIn('is_favorited', json.loads(response.content))
+
+    @mock.patch.object(CostRateThrottle, 'THROTTLE_RATES', {
+        'anon': '100/min', 'user': '150/min'
+    })
+    def test_stream_costs_more(self):
+        self.stream('/api/recipes/')
+        response = self.client.get('/api/recipes/', HTTP_ACCEPT=NDJSON)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.client.get('/api/recipes/').status_code, 200)
@@ -0,0 +1,210 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils.timezone import now
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe
+from sync.models import Change
+
+from .utils import create_recipe, create_user
+
+
+@mock.patch('sync.views.SETTLE_PERIOD', timedelta(0))
+class SyncTests(APITestCase):
+    """Снимок данных и журнал изменений для синхронизации клиентов"""
+
+    url = '/api/sync/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        cls.recipes = [
+            create_recipe(cls.author, f'Рецепт {index}', [cls.ingredient])
+            for index in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def sync(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def snapshot(self):
+        data = self.sync()
+        while data['has_more']:
+            data = self.sync(cursor=data['cursor'])
+        return data['cursor']
+
+    def commit(self):
+        """Выполнение отложенных до фиксации записей журнала"""
+        return self.captureOnCommitCallbacks(execute=True)
+
+    def test_snapshot_pages_cover_everything_once(self):
+        data = self.sync(limit=2)
+        self.assertTrue(data['full_resync'])
+        names = [recipe['name'] for recipe in data['recipes']]
+        while data['has_more']:
+            data = self.sync(cursor=data['cursor'], limit=2)
+            self.assertFalse(data['full_resync'])
+            self.assertLessEqual(len(data['recipes']), 2)
+            names.extend(recipe['name'] for recipe in data['recipes'])
+        self.assertEqual(
+            sorted(names), sorted(recipe.name for recipe in self.recipes)
+        )
+
+    def test_changes_after_snapshot(self):
+        cursor = self.snapshot()
+        recipe = self.recipes[0]
+        with self.commit():
+            recipe.name = 'Новое название'
+            recipe.save()
+        data = self.sync(cursor=cursor)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(
+            [item['name'] for item in data['recipes']], ['Новое название']
+        )
+        # Повторно то же изменение не отдаётся
+        data = self.sync(cursor=data['cursor'])
+        self.assertEqual(data['recipes'], [])
+
+    def test_deleted_objects(self):
+        cursor = self.snapshot()
+        deleted_ids = sorted(recipe.pk for recipe in self.recipes[:2])
+        with self.commit():
+            self.recipes[0].delete()
+            Recipe.objects.filter(pk=self.recipes[1].pk).delete()
+        data = self.sync(cursor=cursor)
+        self.assertEqual(data['deleted']['recipes'], deleted_ids)
+
+    def test_deleted_ingredient_changes_its_recipes(self):
+        cursor = self.snapshot()
+        ingredient_id = self.ingredient.pk
+        with self.commit():
+            self.ingredient.delete()
+        data = self.sync(cursor=cursor)
+        self.assertEqual(data['deleted']['ingredients'], [ingredient_id])
+        self.assertEqual(len(data['recipes']), len(self.recipes))
+        self.assertEqual(data['recipes'][0]['ingredients'], [])
+
+    def test_ingredients_replaced_through_api(self):
+        ingredients = [
+            Ingredient.objects.create(name=f'Специя {index}',
+                                      measurement_unit='г')
+            for index in range(5)
+        ]
+        cursor = self.snapshot()
+        recipe = self.recipes[0]
+        Change.objects.all().delete()
+        self.client.force_authenticate(self.author)
+        with self.commit():
+            response = self.client.patch(f'/api/recipes/{recipe.pk}/', {
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 1}
+                    for ingredient in ingredients
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        # Одна запись журнала на рецепт, а не на каждую строку состава
+        self.assertEqual(
+            list(Change.objects.values_list('kind', 'object_id')),
+            [(Change.RECIPE, recipe.pk)]
+        )
+        data = self.sync(cursor=cursor)
+        self.assertEqual(len(data['recipes'][0]['ingredients']), 5)
+
+    def test_recipe_delete_logged_once(self):
+        ingredients = [
+            Ingredient.objects.create(name=f'Специя {index}',
+                                      measurement_unit='г')
+            for index in range(5)
+        ]
+        recipe = create_recipe(self.author, 'Много специй', ingredients)
+        Change.objects.all().delete()
+        with self.commit():
+            recipe.delete()
+        self.assertEqual(Change.objects.count(), 1)
+
+    def test_long_transaction_committed_after_cursor_is_synced(self):
+        cursor = self.snapshot()
+        # Долгая транзакция сохраняет рецепт раньше, а фиксируется позже
+        with self.captureOnCommitCallbacks() as slow:
+            create_recipe(self.author, 'Долгая транзакция')
+        with self.commit():
+            create_recipe(self.author, 'Быстрая транзакция')
+        data = self.sync(cursor=cursor)
+        self.assertEqual(
+            [item['name'] for item in data['recipes']],
+            ['Быстрая транзакция']
+        )
+        for callback in slow:
+            callback()
+        data = self.sync(cursor=data['cursor'])
+        self.assertEqual(
+            [item['name'] for item in data['recipes']],
+            ['Долгая транзакция']
+        )
+
+    def test_log_is_paged(self):
+        cursor = self.snapshot()
+        with self.commit():
+            for recipe in self.recipes:
+                recipe.save()
+        data = self.sync(cursor=cursor, limit=3)
+        self.assertTrue(data['has_more'])
+        self.assertEqual(len(data['recipes']), 3)
+        data = self.sync(cursor=data['cursor'], limit=3)
+        self.assertFalse(data['has_more'])
+        self.assertEqual(len(data['recipes']), 2)
+
+    def test_updated_since(self):
+        with self.commit():
+            self.recipes[0].save()
+        since = now()
+        Change.objects.update(changed_at=since - timedelta(minutes=1))
+        with self.commit():
+            self.recipes[1].save()
+        data = self.sync(updated_since=since.isoformat())
+        self.assertFalse(data['full_resync'])
+        self.assertEqual(
+            [item['id'] for item in data['recipes']], [self.recipes[1].pk]
+        )
+
+    def test_expired_cursor_gets_full_resync(self):
+        cursor = self.snapshot()
+        with self.commit():
+            self.recipes[0].save()
+            self.recipes[1].save()
+        Change.objects.update(changed_at=now() - timedelta(days=365))
+        with self.commit():
+            self.recipes[2].save()
+        call_command('prune_sync_changes', stdout=mock.Mock())
+        # Запись на границе журнала сохраняется
+        self.assertEqual(Change.objects.count(), 2)
+        data = self.sync(cursor=cursor)
+        self.assertTrue(data['full_resync'])
+        self.assertEqual(len(data['recipes']), len(self.recipes))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SyncSettleTests(APITestCase):
+    """Записи журнала моложе SETTLE_PERIOD придерживаются"""
+
+    def test_recent_changes_are_held_back(self):
+        author = create_user('author')
+        cursor = self.client.get('/api/sync/').json()['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            create_recipe(author)
+        data = self.client.get('/api/sync/', {'cursor': cursor}).json()
+        self.assertEqual(data['recipes'], [])
+        self.assertEqual(data['cursor'], cursor)
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APITestCase
+
+from foodgram.throttling import CostRateThrottle, pagination_cost
+from recipes.views import CustomPagination
+
+from .utils import create_user
+
+
+@mock.patch('foodgram.throttling.LOCK_RETRY_DELAY', 0)
+@mock.patch.object(
+    CostRateThrottle, 'THROTTLE_RATES', {'anon': '10/min', 'user': '20/min'}
+)
+class ThrottlingTests(APITestCase):
+    """Корзины токенов с учётом стоимости запросов"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        timer = mock.patch.object(
+            CostRateThrottle, 'timer', mock.Mock(side_effect=lambda: self.now)
+        )
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def statuses(self, url, count, user=None):
+        self.client.force_authenticate(user)
+        return [self.client.get(url).status_code for _ in range(count)]
+
+    def test_cost_drains_bucket(self):
+        # Список ингредиентов стоит 2 токена из 10
+        self.assertEqual(
+            self.statuses('/api/ingredients/', 6), [200] * 5 + [429]
+        )
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(response['Retry-After'], '12')
+
+    def test_bucket_refills(self):
+        self.statuses('/api/ingredients/', 5)
+        self.now += 6
+        self.assertEqual(self.statuses('/api/ingredients/', 2), [429, 429])
+        self.now += 6
+        self.assertEqual(self.statuses('/api/ingredients/', 2), [200, 429])
+
+    def test_large_page_costs_more(self):
+        # limit=100 стоит 17 токенов и ограничивается ёмкостью корзины
+        self.assertEqual(
+            self.statuses('/api/recipes/?limit=100', 2), [200, 429]
+        )
+        self.assertEqual(self.statuses('/api/recipes/', 1), [429])
+
+    def test_separate_buckets(self):
+        first, second = create_user('first'), create_user('second')
+        self.statuses('/api/ingredients/', 5)
+        self.assertEqual(self.statuses('/api/ingredients/', 1), [429])
+        self.assertEqual(
+            self.statuses('/api/ingredients/', 11, first), [200] * 10 + [429]
+        )
+        self.assertEqual(self.statuses('/api/ingredients/', 1, second), [200])
+
+    def test_locked_bucket_rejects(self):
+        self.client.get('/api/ingredients/')
+        cache.add('throttle_anon_127.0.0.1:lock', 1)
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        cache.delete('throttle_anon_127.0.0.1:lock')
+        self.assertEqual(self.statuses('/api/ingredients/', 1), [200])
+
+
+class PaginationCostTests(SimpleTestCase):
+    """Стоимость страницы растёт с размером и глубиной"""
+
+    def cost(self, query):
+        request = Request(RequestFactory().get('/', query))
+        return pagination_cost(request, CustomPagination())
+
+    def test_costs(self):
+        self.assertEqual(self.cost({}), 1)
+        self.assertEqual(self.cost({'limit': 12}), 2)
+        self.assertEqual(self.cost({'limit': 500}), 17)
+        self.assertEqual(self.cost({'limit': 100, 'page': 21}), 19)
+        self.assertEqual(pagination_cost(None, None), 1)
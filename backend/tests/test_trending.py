@@ -0,0 +1,142 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, ShoppingCart
+from stats.models import RecipeStat
+from stats.services import record_trending_event
+
+from .utils import create_recipe, create_user
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=1)
+class TrendingTests(APITestCase):
+    """Сортировка ?ordering=trending по затухающей популярности"""
+
+    url = '/api/recipes/?ordering=trending'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        cls.author = create_user('author')
+        cls.recipes = [
+            create_recipe(cls.author, f'Рецепт {index}') for index in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def score(self, recipe):
+        stat = RecipeStat.objects.filter(recipe=recipe).first()
+        return stat and stat.trending_score
+
+    def ids(self, user=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def favorite(self, recipe, method='post'):
+        self.client.force_authenticate(self.user)
+        return getattr(self.client, method)(
+            f'/api/recipes/{recipe.pk}/favorite/'
+        )
+
+    def test_add(self):
+        self.assertEqual(self.favorite(self.recipes[1]).status_code, 201)
+        self.assertIsNotNone(self.score(self.recipes[1]))
+        self.assertEqual(self.ids()[0], self.recipes[1].pk)
+
+    def test_remove(self):
+        self.favorite(self.recipes[1])
+        self.assertEqual(
+            self.favorite(self.recipes[1], 'delete').status_code, 204
+        )
+        self.assertIsNone(self.score(self.recipes[1]))
+
+    def test_cascade_delete_subtracts(self):
+        other = create_user('other')
+        Favorite.objects.create(user=other, recipe=self.recipes[1])
+        ShoppingCart.objects.create(user=other, recipe=self.recipes[1])
+        self.assertIsNotNone(self.score(self.recipes[1]))
+        other.delete()
+        self.assertIsNone(self.score(self.recipes[1]))
+
+    @override_settings(TRENDING_TOP_N=1)
+    def test_pages_continue_past_cached_head(self):
+        extra = create_recipe(self.author, 'Рецепт без оценки')
+        record_trending_event(self.recipes[2].pk, 2.0)
+        record_trending_event(self.recipes[0].pk, 1.0)
+        self.ids()
+        # Начало из кэша, затем оценка по индексу, затем новые рецепты
+        record_trending_event(self.recipes[0].pk, 5.0)
+        expected = [
+            self.recipes[2].pk, self.recipes[0].pk,
+            extra.pk, self.recipes[1].pk
+        ]
+        pages = []
+        for page in range(1, 4):
+            response = self.client.get(f'{self.url}&limit=2&page={page}')
+            if page == 3:
+                self.assertEqual(response.status_code, 404)
+                break
+            self.assertEqual(response.json()['count'], 4)
+            pages += [item['id'] for item in response.json()['results']]
+        self.assertEqual(pages, expected)
+        response = self.client.get(f'{self.url}&limit=3&page=2')
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            expected[3:]
+        )
+        # Фильтры применяются и к кэшированному началу списка
+        response = self.client.get(
+            f'{self.url}&author={self.author.pk}&limit=10'
+        )
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']], expected
+        )
+
+    def test_decay(self):
+        # Событие двухчасовой давности весит четверть нового
+        record_trending_event(
+            self.recipes[0].pk, 1.0, now() - timedelta(hours=2)
+        )
+        record_trending_event(self.recipes[1].pk, 0.5)
+        self.assertEqual(
+            self.ids()[:2], [self.recipes[1].pk, self.recipes[0].pk]
+        )
+
+    def test_anonymous_and_authenticated_share_cached_head(self):
+        record_trending_event(self.recipes[0].pk, 1.0)
+        expected = self.ids()
+        # Кэшированное начало списка не меняется до истечения кэша
+        record_trending_event(self.recipes[2].pk, 5.0)
+        self.assertEqual(self.ids(), expected)
+        self.assertEqual(self.ids(self.user), expected)
+        self.assertEqual(self.ids(self.user)[0], self.recipes[0].pk)
+
+    def test_rebuild_recomputes_scores(self):
+        created_at = now() - timedelta(hours=1)
+        Favorite.objects.create(
+            user=self.user, recipe=self.recipes[0], created_at=created_at
+        )
+        ShoppingCart.objects.create(
+            user=self.user, recipe=self.recipes[0], created_at=created_at
+        )
+        # Оценка накоплена по времени событий до появления created_at
+        RecipeStat.objects.filter(recipe=self.recipes[0]).update(
+            trending_score=-100.0
+        )
+        record_trending_event(self.recipes[1].pk, 1.0)
+        call_command('rebuild_stats', stdout=mock.Mock())
+        self.assertIsNone(self.score(self.recipes[1]))
+        self.assertGreater(self.score(self.recipes[0]), 0)
+        # После пересчёта удаление вычитает ровно добавленный вклад
+        self.favorite(self.recipes[0], 'delete')
+        self.client.delete(f'/api/recipes/{self.recipes[0].pk}/shopping_cart/')
+        self.assertIsNone(self.score(self.recipes[0]))
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+# Как gunicorn с preload_app: конфигурация читается до загрузки
+# приложения, затем импорт wsgi прогревает кэши и пишет метрики
+BOOT_SCRIPT = '''
+import runpy
+import sys
+
+runpy.run_path('gunicorn.conf.py')
+
+from django.conf import settings
+
+settings.DATABASES['default']['NAME'] = sys.argv[1]
+
+import foodgram.wsgi  # noqa
+from foodgram.warmup import is_ready
+
+sys.exit(0 if is_ready() else 1)
+'''
+
+
+class WarmUpTests(TestCase):
+    """Загрузка приложения в мастере gunicorn"""
+
+    def test_wsgi_import_creates_missing_metrics_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            metrics_dir = os.path.join(directory, 'metrics')
+            result = subprocess.run(
+                [sys.executable, '-c', BOOT_SCRIPT,
+                 connection.settings_dict['NAME']],
+                cwd=settings.BASE_DIR,
+                env={**os.environ, 'PROMETHEUS_MULTIPROC_DIR': metrics_dir},
+                capture_output=True,
+                text=True
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            # Прогрев записал обращения к кэшам в файлы метрик
+            self.assertTrue(os.listdir(metrics_dir))
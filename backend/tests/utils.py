@@ -0,0 +1,35 @@
+from recipes.models import Recipe, RecipeIngredient
+from users.models import User
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='password',
+        first_name='Имя',
+        last_name='Фамилия'
+    )
+
+
+def create_recipe(author, name='Рецепт', ingredients=(), amount=5, **fields):
+    fields.setdefault('image', 'recipes/test.png')
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text=fields.pop('text', 'Текст'),
+        cooking_time=fields.pop('cooking_time', 10),
+        **fields
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient in ingredients
+    )
+    return recipe
+
+
+# Изображение 1x1 для создания рецептов через API
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ'
+    'AAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
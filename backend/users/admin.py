@@ -1,11 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from foodgram.admin_mixins import ScalableAdminMixin
+
 from .models import User, Subscription
 
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(ScalableAdminMixin, UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name')
     search_fields = ('username', 'email', 'first_name', 'last_name')
     list_filter = ('is_staff', 'is_superuser', 'is_active')
@@ -13,7 +15,8 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
     search_fields = ('user__username', 'author__username')
-    list_filter = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
@@ -43,6 +43,7 @@ class User(AbstractUser):
         null=True,
         blank=True
     )
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
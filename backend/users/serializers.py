@@ -1,11 +1,76 @@
+from django.conf import settings
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
 from .models import Subscription, User
 from drf_extra_fields.fields import Base64ImageField
 from djoser.serializers import UserSerializer as DjoserUserSerializer
+from foodgram.fieldsets import SparseFieldsetsMixin
+from foodgram.loaders import BatchListSerializer, get_loader
+from foodgram.metrics import record_upload
 from recipes.models import Recipe
 
 
-class UserSerializer(DjoserUserSerializer):
+def media_base_url(context):
+    """
+    Абсолютный адрес MEDIA_URL, вычисляемый один раз на ответ.
+    Без запроса в контексте возвращается относительный MEDIA_URL.
+    """
+    if 'media_base_url' not in context:
+        request = context.get('request')
+        context['media_base_url'] = (
+            request.build_absolute_uri(settings.MEDIA_URL)
+            if request else settings.MEDIA_URL
+        )
+    return context['media_base_url']
+
+
+def subscribed_loader(context, user):
+    """Подписан ли пользователь на авторов: один запрос на ответ"""
+    def load(author_ids):
+        return dict.fromkeys(
+            Subscription.objects.filter(
+                user=user, author_id__in=author_ids
+            ).values_list('author_id', flat=True),
+            True
+        )
+    return get_loader(context, 'is_subscribed', load, False)
+
+
+def recipes_count_loader(context):
+    def load(author_ids):
+        return dict(
+            Recipe.objects.filter(author_id__in=author_ids).order_by()
+            .values('author_id').annotate(count=Count('pk'))
+            .values_list('author_id', 'count')
+        )
+    return get_loader(context, 'recipes_count', load, 0)
+
+
+def author_recipes_loader(context, limit):
+    """
+    Последние рецепты авторов, не больше limit на автора.
+    Ограничение применяется в базе оконной функцией.
+    """
+    def load(author_ids):
+        recipes = Recipe.objects.filter(
+            author_id__in=author_ids
+        ).only('id', 'name', 'image', 'cooking_time', 'author_id')
+        if limit is not None:
+            recipes = recipes.annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('pub_date').desc()
+            )).filter(row_number__lte=limit)
+        grouped = {}
+        for recipe in recipes.order_by('-pub_date'):
+            grouped.setdefault(recipe.author_id, []).append(recipe)
+        return grouped
+    return get_loader(context, f'author_recipes:{limit}', load, [])
+
+
+class UserSerializer(SparseFieldsetsMixin, DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
 
@@ -16,21 +81,36 @@ class UserSerializer(DjoserUserSerializer):
             'last_name', 'email', 'is_subscribed',
             'avatar'
         )
+        list_serializer_class = BatchListSerializer
+
+    def _current_user(self):
+        request = self.context.get('request')
+        if not request or request.user.is_anonymous:
+            return None
+        return request.user
+
+    def prime(self, users):
+        """Регистрация ключей для пакетной загрузки"""
+        user = self._current_user()
+        if user is not None and 'is_subscribed' in self.fields:
+            subscribed_loader(self.context, user).prime(
+                obj.pk for obj in users
+                if obj.pk != user.pk and not hasattr(obj, 'is_subscribed')
+            )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
+        # Списки пользователей аннотируют поле запросом Exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        user = self._current_user()
+        if user is None or user.pk == obj.pk:
             return False
-        return Subscription.objects.filter(
-            user=user,
-            author=obj
-        ).exists()
+        return subscribed_loader(self.context, user).load(obj.pk)
 
     def get_avatar(self, obj):
-        request = self.context.get('request')
-        if obj.avatar and hasattr(obj.avatar, 'url'):
-            return request.build_absolute_uri(obj.avatar.url)
-        return ""
+        if not obj.avatar:
+            return ""
+        return media_base_url(self.context) + filepath_to_uri(obj.avatar.name)
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
@@ -53,22 +133,38 @@ class SubscriptionSerializer(UserSerializer):
             'last_name', 'is_subscribed', 'recipes',
             'recipes_count', 'avatar'
         )
+        list_serializer_class = BatchListSerializer
 
-    def get_recipes(self, obj):
+    def _recipes_limit(self):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-
-        if recipes_limit is not None:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        try:
+            limit = int(request.query_params['recipes_limit'])
+        except (AttributeError, KeyError, ValueError):
+            return None
+        return limit if limit >= 0 else None
+
+    def prime(self, users):
+        super().prime(users)
+        author_ids = [obj.pk for obj in users]
+        if 'recipes' in self.fields:
+            author_recipes_loader(
+                self.context, self._recipes_limit()
+            ).prime(author_ids)
+        if 'recipes_count' in self.fields:
+            recipes_count_loader(self.context).prime(
+                obj.pk for obj in users if not hasattr(obj, 'recipes_count')
+            )
 
+    def get_recipes(self, obj):
+        recipes = author_recipes_loader(
+            self.context, self._recipes_limit()
+        ).load(obj.pk)
         return RecipeShortSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return recipes_count_loader(self.context).load(obj.pk)
 
 
 class AvatarSerializer(serializers.ModelSerializer):
@@ -78,6 +174,10 @@ class AvatarSerializer(serializers.ModelSerializer):
         model = User
         fields = ('avatar',)
 
+    def validate_avatar(self, value):
+        record_upload('avatar', value)
+        return value
+
     def update(self, instance, validated_data):
         instance.avatar = validated_data.get('avatar', instance.avatar)
         instance.save()
@@ -85,7 +185,7 @@ class AvatarSerializer(serializers.ModelSerializer):
 
     def delete(self, instance):
         if instance.avatar:
-            instance.avatar.delete(save=False)
+            # Файл удалит сборщик cleanup
             instance.avatar = None
             instance.save()
         return instance
@@ -1,3 +1,4 @@
+from django.db.models import BooleanField, Count, Exists, OuterRef, Value
 from django.shortcuts import get_object_or_404
 from rest_framework import status, permissions
 from rest_framework.decorators import action
@@ -6,6 +7,12 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from djoser.views import UserViewSet as DjoserUserViewSet
 
+from foodgram.fieldsets import is_field_requested
+from foodgram.mixins import ConditionalGetMixin, relation_fingerprint
+from foodgram.streaming import STREAM_THROTTLE_COST, NDJSONStreamMixin
+from foodgram.throttling import pagination_cost
+from recipes.feed import backfill_feed, remove_author_from_feed
+
 from .models import Subscription, User
 from .serializers import (
     SubscriptionSerializer, AvatarSerializer,
@@ -15,12 +22,45 @@ from .serializers import (
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = 100
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(NDJSONStreamMixin, ConditionalGetMixin,
+                  DjoserUserViewSet):
     """Представление для пользователей"""
     pagination_class = CustomPagination
 
+    def get_throttle_cost(self, request):
+        """Стоимость запроса для ограничения частоты"""
+        if (self.action in ('list', 'subscriptions')
+                and self.wants_ndjson()):
+            return STREAM_THROTTLE_COST
+        if self.action in ('list', 'subscriptions'):
+            return pagination_cost(request, self.paginator)
+        return 1
+
+    def get_user_state(self, user):
+        """Подписки пользователя влияют на поле is_subscribed"""
+        if not is_field_requested(self.request, 'is_subscribed'):
+            return ()
+        return (
+            relation_fingerprint(Subscription.objects.filter(user=user)),
+        )
+
+    def get_queryset(self):
+        """Пользователи с флагом подписки, вычисленным в том же запросе"""
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not is_field_requested(self.request, 'is_subscribed'):
+            return queryset
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))
+        ))
+
     def get_permissions(self):
         """Получение прав доступа"""
         if self.action == 'retrieve' or self.action == 'list':
@@ -70,6 +110,7 @@ class UserViewSet(DjoserUserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            backfill_feed(user, author)
 
             subscription_serializer = SubscriptionSerializer(
                 author,
@@ -87,6 +128,7 @@ class UserViewSet(DjoserUserViewSet):
         if not subscription:
             return Response(status=status.HTTP_400_BAD_REQUEST)
         subscription.delete()
+        remove_author_from_feed(user, author)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -97,7 +139,15 @@ class UserViewSet(DjoserUserViewSet):
     def subscriptions(self, request):
         """Получение подписок пользователя"""
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        )
+        if is_field_requested(request, 'recipes_count'):
+            queryset = queryset.annotate(recipes_count=Count('recipes'))
+        # При GROUP BY порядок из Meta.ordering не применяется
+        queryset = queryset.order_by(*User._meta.ordering)
+        if self.wants_ndjson():
+            return self.stream_ndjson(queryset, SubscriptionSerializer)
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = SubscriptionSerializer(